@@ -1,2 +1,2 @@
 from .command import Reader
-from .respond import Tag
+from .respond import Tag, RealtimeTag
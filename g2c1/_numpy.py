@@ -0,0 +1,38 @@
+from array import array # for compact sample indices
+import numpy as np # for array math
+
+'''
+Accelerated implementations of the "numpy" backend.
+Each function returns exactly the same as its pure Python baseline.
+'''
+
+
+def samplesToEdges(self, samples, samplerate=1e6, mid=0.4, offset=0, levels=None, hyst=0.1):
+    '''
+    Schmitt trigger by forward filling the last level outside of the hysteresis
+    '''
+    samples = np.asarray(samples, dtype=float) # compare with thresholds in double precision
+    sMin, sMax = levels if levels else (float(samples.min()), float(samples.max()))
+
+    # prepare schmitt trigger
+    delta = sMax-sMin
+    threshMid = sMin+mid*delta
+    threshHigh = threshMid+hyst*delta
+    threshLow = threshMid-hyst*delta
+
+    # level state with leading low state, kept inside hysteresis
+    defined = np.concatenate(([True], (samples > threshHigh) | (samples < threshLow)))
+    high = np.concatenate(([False], samples > threshHigh))
+    iDefined = np.maximum.accumulate(np.where(defined, np.arange(len(defined)), 0))
+    raised = high[iDefined]
+
+    # get raising edges
+    iRaising = np.flatnonzero(raised[1:] & ~raised[:-1])
+    self.edgeIndices = array('q', [offset])
+    self.edgeIndices.frombytes((offset+iRaising).astype(np.int64).tobytes())
+    return (1e6*np.diff(iRaising, prepend=0)/samplerate).tolist()
+
+
+IMPLEMENTATIONS = {
+    'Tag.samplesToEdges': samplesToEdges
+}
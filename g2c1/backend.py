@@ -0,0 +1,73 @@
+import os # to read the backend selection from the environment
+from functools import wraps # to keep names and docs of dispatched functions
+from importlib.util import find_spec # to check for numpy without importing it
+
+'''
+Selection of the compute backend for the hot functions.
+"python" is the pure Python baseline, "numpy" uses accelerated implementations
+and "auto" (default) picks "numpy" when it is installed.
+Set the environment variable G2C1_BACKEND or call use().
+'''
+
+BACKENDS = ('python', 'numpy')
+
+_selected = os.environ.get('G2C1_BACKEND', 'auto')
+_impls = None # accelerated implementations by qualified function name
+
+
+def use(name):
+    '''
+    Selects the compute backend
+
+    :param name: "python", "numpy" or "auto"
+    '''
+    global _selected, _impls
+    if name not in BACKENDS+('auto',):
+        raise ValueError('Unknown backend {}, choose from {}'.format(name, BACKENDS+('auto',)))
+    _selected = name
+    _impls = None
+
+
+def current():
+    '''
+    :returns: name of the selected backend with "auto" resolved
+    '''
+    if _selected == 'auto':
+        return 'numpy' if find_spec('numpy') else 'python'
+    if _selected not in BACKENDS:
+        raise ValueError('Unknown backend {} in G2C1_BACKEND, choose from {}'.format(_selected, BACKENDS+('auto',)))
+    return _selected
+
+
+def _implementations():
+    '''
+    Imports the implementations of the selected backend on first use
+
+    :returns: dict of functions by qualified name
+    '''
+    global _impls
+    if _impls is None:
+        if current() == 'numpy':
+            from . import _numpy # imports numpy
+            _impls = _numpy.IMPLEMENTATIONS
+        else:
+            _impls = {}
+    return _impls
+
+
+def accelerated(func):
+    '''
+    Decorator dispatching calls to the implementation of the selected backend,
+    the decorated function is the pure Python baseline and available as attribute "python"
+
+    :param func: function or method
+    :returns: dispatching function
+    '''
+    name = func.__qualname__
+
+    @wraps(func)
+    def dispatch(*args, **kwargs):
+        return _implementations().get(name, func)(*args, **kwargs)
+
+    dispatch.python = func
+    return dispatch
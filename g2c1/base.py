@@ -6,37 +6,38 @@ def crc5(bits):
     :param bits: list of 0/1 ints of the message without checksum bits, starting with the MSB
     :returns: list of 0/1 ints of the checksum bits, starting with the MSB
     '''
-    # preparations
-    poly = [0, 1, 0, 0, 1]
-    flag = 0
+    reg = 0b01001 # initially fill Q[4:0] with polynom
 
-    def shift(bits):
-        '''shifts 0s/1s in list bits to left by 1'''
-        return bits[1:]+[0]
+    for bit in bits:
+        # XOR polynom when shifted out MSB and input bit differ
+        msb = reg >> 4
+        reg = (reg << 1) & 0b11111
+        if msb != bit:
+            reg ^= 0b01001
 
-    def xor(bits):
-        '''XOR 0s/1s in list bits with poly'''
-        return [1 if b != p else 0 for b, p in zip(bits, poly)]
+    return [(reg >> i) & 1 for i in range(4, -1, -1)]
 
-    reg = poly # initially fill Q[4:0] with polynom
-    inp = bits # initially fill input with data bits
 
-    # algorithms
-    while len(inp) > 0:
-        # check if MSBs of input and register trigger XOR in next round
-        if reg[0] != inp[0]:
-            flag = 1
-
-        # shift register and input
-        reg = shift(reg)
-        inp = shift(inp)[:-1]
-
-        # check flag to XOR register with polynom
-        if flag:
-            reg = xor(reg)
-            flag = 0
+def crc16(bits):
+    '''
+    Generates the CRC16 checksum (CRC-16/CCITT, preset 0xFFFF, ones complement) 
+    for the reader command
 
-    return reg
+    :param bits: list of 0/1 ints of the message without checksum bits, starting with the MSB
+    :returns: list of 0/1 ints of the checksum bits, starting with the MSB
+    '''
+    poly = 0x1021
+    reg = 0xFFFF # preset
+
+    for bit in bits:
+        # XOR polynom when shifted out MSB and input bit differ
+        msb = reg >> 15
+        reg = (reg << 1) & 0xFFFF
+        if msb != bit:
+            reg ^= poly
+    
+    reg ^= 0xFFFF # ones complement
+    return [int(b) for b in format(reg, '016b')]
 
 
 def pulsesToSamples(pulses, samplerate=1e6):
@@ -59,10 +60,117 @@ def pulsesToSamples(pulses, samplerate=1e6):
     return samples
 
 
+def iqToSamples(iq, avg=1, decim=1, nChunk=1 << 16):
+    '''
+    Converts complex baseband IQ samples to envelope magnitudes, 
+    moving average filtered and decimated (requires numpy). 
+    The input is processed in chunks, so intermediate arrays stay small 
+    and only the decimated output has the full length.
+
+    :param iq: array of complex IQ samples (e.g. complex64) 
+        or of interleaved integer or float I/Q values
+    :param avg: length of the moving average filter in samples (1 disables filtering)
+    :param decim: decimation factor, output sample rate is samplerate/decim
+    :param nChunk: input samples processed at once
+    :returns: numpy array of sample magnitudes, 
+        element i averages the input samples i*decim...i*decim+avg-1
+    '''
+    import numpy as np # only needed for this front end
+
+    iq = np.asarray(iq)
+    if not np.iscomplexobj(iq):
+        iq = iq.reshape(-1, 2) # interleaved I/Q, e.g. int16 from SDR tools
+    
+    def magnitudes(block):
+        if block.ndim == 1:
+            return np.abs(block) # complex64 results in float32
+        return np.hypot(block[:, 0], block[:, 1], dtype=np.float32) # integers casted in small buffers
+    
+    avg = max(avg, 1)
+    if len(iq) < avg:
+        return np.empty(0, np.float32)
+    if avg == 1:
+        return magnitudes(iq[::decim])
+    
+    # moving average evaluated only at the decimated output positions, chunk by chunk
+    nOut = (len(iq)-avg)//decim+1
+    nOutChunk = max(nChunk//decim, 1)
+    samples = None
+    for iOut in range(0, nOut, nOutChunk):
+        n = min(nOutChunk, nOut-iOut)
+        mags = magnitudes(iq[iOut*decim:(iOut+n-1)*decim+avg])
+        if samples is None:
+            samples = np.empty(nOut, mags.dtype)
+        cumSum = np.empty(len(mags)+1)
+        cumSum[0] = 0.
+        np.cumsum(mags, out=cumSum[1:])
+        samples[iOut:iOut+n] = (cumSum[avg::decim][:n]-cumSum[::decim][:n])/avg
+    
+    return samples
+
+
+class BitView:
+    '''
+    Zero-copy view on a range of a list of bits
+    '''
+    def __init__(self, bits, start=0, stop=None):
+        '''
+        :param bits: list of 0/1 ints or another view
+        :param start: index of first bit in view
+        :param stop: index after last bit in view (None for all remaining bits)
+        '''
+        end = len(bits) if stop is None else min(stop, len(bits))
+        if isinstance(bits, BitView):
+            # view on the underlying list instead of nesting views
+            start += bits.start
+            end += bits.start
+            bits = bits.bits
+        self.bits = bits
+        self.start = start
+        self.stop = max(start, end)
+    
+
+    def __len__(self):
+        return self.stop-self.start
+    
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return BitView(self, start, stop)
+        
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('Bit index out of range')
+        return self.bits[self.start+key]
+    
+
+    def __iter__(self):
+        bits = self.bits
+        for i in range(self.start, self.stop):
+            yield bits[i]
+    
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all(s == o for s, o in zip(self, other))
+        except TypeError:
+            return False
+    
+
+    def __repr__(self):
+        return str(list(self))
+
+
 class Part:
     '''
     Part of a message
     '''
+    view = False # parse from a zero-copy view on the message bits instead of a list slice
+
     def __init__(self, nBits, value=None):
         '''
         :param nBits: number of bits
@@ -72,6 +180,18 @@ class Part:
         self.value = value
     
 
+    def parseLen(self, bits, start=0):
+        '''
+        Number of bits the part occupies when parsing. 
+        Variable-length parts determine it from the leading bits.
+
+        :param bits: list of 0/1 ints of the message
+        :param start: index of the first bit of the part
+        :returns: number of bits
+        '''
+        return self.nBits
+    
+
     def fromBits(self, bits):
         '''
         :param bits: list of 0/1 ints
@@ -146,6 +266,85 @@ class Constant(LookUp):
         self.add(bits, value)
 
 
+class EBV(Part):
+    '''
+    Extensible bit vector: blocks of 8 bits, 
+    each with an extension flag followed by 7 value bits
+    '''
+    def __init__(self, value=None):
+        '''
+        :param value: current/default unsigned int
+        '''
+        self.value = value
+    
+
+    @property
+    def nBits(self):
+        nBlocks = 1
+        while self.value >> 7*nBlocks:
+            nBlocks += 1
+        return 8*nBlocks
+    
+
+    def parseLen(self, bits, start=0):
+        nBits = 8
+        # follow extension flags
+        while start+nBits <= len(bits) and bits[start+nBits-8] == 1:
+            nBits += 8
+        return nBits
+    
+
+    def fromBits(self, bits):
+        self.value = 0
+        for iBlock in range(0, len(bits), 8):
+            self.value = (self.value << 7)+int(self._bitStr(bits[iBlock+1:iBlock+8]), 2)
+    
+
+    def toBits(self):
+        nBlocks = self.nBits//8
+        bits = []
+        for iBlock in reversed(range(nBlocks)):
+            bits.append(1 if iBlock else 0) # extension flag
+            bitStr = format((self.value >> 7*iBlock) & 0x7F, '07b')
+            bits.extend(int(b) for b in bitStr)
+        return bits
+
+
+class Mask(Part):
+    '''
+    Bits prefixed by their length, e.g. a select mask
+    '''
+    view = True
+
+    def __init__(self, value=None, nLenBits=8):
+        '''
+        :param value: current/default list of 0/1 ints
+        :param nLenBits: number of bits of the length prefix
+        '''
+        self.value = value
+        self.nLenBits = nLenBits
+    
+
+    @property
+    def nBits(self):
+        return self.nLenBits+len(self.value)
+    
+
+    def parseLen(self, bits, start=0):
+        return self.nLenBits+int(self._bitStr(bits[start:start+self.nLenBits]), 2)
+    
+
+    def fromBits(self, bits):
+        self.value = BitView(bits, self.nLenBits) # no copy of mask bits
+    
+
+    def toBits(self):
+        if len(self.value) >= 1 << self.nLenBits:
+            raise ValueError('Mask with {} bits too long'.format(len(self.value)))
+        bitStr = format(len(self.value), '0{}b'.format(self.nLenBits))
+        return [int(b) for b in bitStr]+list(self.value)
+
+
 class Message:
     '''
     Reader or tag message consisting of bits
@@ -181,7 +380,7 @@ class Message:
     @property
     def nBits(self):
         '''
-        :returns: sum of all message part bits
+        :returns: sum of all message part bits (for the current values of variable-length parts)
         '''
         return sum(part.nBits for part in self.parts)
     
@@ -192,20 +391,81 @@ class Message:
 
         :param bits: list of 0/1 ints
         '''
-        # sanity check
-        if self.nBits > len(bits):
-            raise TypeError('Invalid number of bits for message')
-        
         # parse bits
         bitSum = 0
         for part in self.parts:
-            # select bits for part
-            parseBits = bits[bitSum:bitSum+part.nBits]
-            bitSum += part.nBits
+            nBits = part.parseLen(bits, bitSum)
+            # sanity check
+            if bitSum+nBits > len(bits):
+                raise TypeError('Invalid number of bits for message')
+            # select bits for part, long variable-length parts without copying
+            if part.view:
+                parseBits = BitView(bits, bitSum, bitSum+nBits)
+            else:
+                parseBits = bits[bitSum:bitSum+nBits]
+            bitSum += nBits
             # convert to value and store in part
             part.fromBits(parseBits)
     
 
+    def fromBitMatrix(self, bits):
+        '''
+        Decodes many messages of this type at once into columns (requires numpy). 
+        The message itself is not changed.
+
+        :param bits: N x k matrix of 0/1 ints with one message (including checksum) per row 
+            or N ints with the message bits packed, starting with the MSB
+        :returns: dict of numpy arrays with one column per named part 
+            and the column "crcValid" with True for matching checksums
+        '''
+        import numpy as np # only needed for bulk decoding
+
+        # sanity check
+        if any(type(part).parseLen is not Part.parseLen for part in self.parts):
+            raise TypeError('Bulk decoding requires fixed-length message parts')
+        nData = self.nBits
+        nCheck = len(self.checksumFunc(nData*[0])) if self.checksumFunc else 0
+        
+        # unpack bits
+        bits = np.asarray(bits)
+        if bits.ndim == 1:
+            bits = (bits[:, None] >> np.arange(nData+nCheck-1, -1, -1)) & 1
+        if bits.ndim != 2 or bits.shape[1] != nData+nCheck:
+            raise TypeError('Invalid number of bits for message')
+        bits = bits.astype(np.int64)
+
+        # parse columns of named parts
+        names = {id(part): name for name, part in vars(self).items() if isinstance(part, Part)}
+        cols = {}
+        bitSum = 0
+        for part in self.parts:
+            codes = bits[:, bitSum:bitSum+part.nBits] @ (1 << np.arange(part.nBits-1, -1, -1))
+            bitSum += part.nBits
+            name = names.get(id(part))
+            if name is None:
+                continue # e.g. command constant
+            if isinstance(part, LookUp):
+                # table indexed by bits, None for undefined bit combinations
+                table = (1 << part.nBits)*[None]
+                for bitStr, value in part.combos.items():
+                    table[int(bitStr, 2)] = value
+                table = np.array(table, dtype=object if None in table else None)
+                cols[name] = table[codes]
+            else:
+                cols[name] = codes
+        
+        # checksum is affine in the data bits: crc(x) = crc(0) XOR sum of x_i*(crc(e_i) XOR crc(0))
+        if self.checksumFunc:
+            check0 = np.array(self.checksumFunc(nData*[0]))
+            unitChecks = np.array([self.checksumFunc(i*[0]+[1]+(nData-i-1)*[0]) for i in range(nData)])
+            checks = (check0+bits[:, :nData] @ (unitChecks ^ check0)) % 2
+            cols['crcValid'] = np.all(checks == bits[:, nData:], axis=1)
+        else:
+            cols['crcValid'] = np.ones(len(bits), dtype=bool)
+        
+        return cols
+    
+
     def toBits(self):
         '''
         Converts the current state of message to bits
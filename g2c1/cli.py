@@ -0,0 +1,223 @@
+import argparse # for command line arguments
+import json # for JSON lines output
+import sys # for standard streams
+from time import perf_counter # for throughput statistics
+from .base import Part, iqToSamples # to output message parts and convert IQ samples
+from .respond import RealtimeTag # to decode the sample stream
+
+'''
+Command line decoder for raw sample streams, e.g. piped from SDR tools:
+rtl_sdr -s 2048000 -f 866.3e6 - | g2c1-decode -r 2048000 -f u8
+'''
+
+FORMATS = {
+    'u8': ('u1', 2), # interleaved unsigned 8 bit I/Q (e.g. rtl_sdr)
+    'i16': ('<i2', 2), # interleaved signed 16 bit I/Q
+    'cf32': ('<c8', 1), # complex float32 I/Q
+    'f32': ('<f4', 1) # float32 magnitudes
+}
+
+
+def commandRecord(cmd, decim=1):
+    '''
+    Converts a received command to a JSON-compatible dict
+
+    :param cmd: received command
+    :param decim: decimation factor of the sample indices of the command
+    :returns: dict
+    '''
+    msg = cmd.message
+    return {
+        'start': cmd.start,
+        'end': cmd.end,
+        'sampleStart': cmd.sampleStart*decim,
+        'sampleEnd': cmd.sampleEnd*decim,
+        'tari': cmd.tari,
+        'rtCal': cmd.rtCal,
+        'trCal': cmd.trCal,
+        'blf': cmd.blf,
+        'type': cmd.msgType.__name__ if cmd.msgType else None,
+        'bits': ''.join(str(b) for b in cmd.bits),
+        'fields': {name: part.value for name, part in vars(msg).items() if isinstance(part, Part)} if msg else None,
+        'latency': cmd.latency
+    }
+
+
+class Decoder:
+    '''
+    Decodes a raw sample stream block by block with bounded memory
+    and writes a record per received command
+    '''
+    def __init__(self, samplerate, fmt='cf32', avg=1, decim=1, timeout=None, output=None, log=None, stats=10.):
+        '''
+        :param samplerate: sample rate of the stream in Hz
+        :param fmt: sample format, one of FORMATS
+        :param avg: length of the moving average filter in samples
+        :param decim: decimation factor
+        :param timeout: time without raising edge in multiples of rtCal to finish a command, None for rtCal-tari/2
+        :param output: text stream for JSON lines, None disables them
+        :param log: LogWriter for binary records, None disables them
+        :param stats: interval in s of throughput statistics on stderr, 0 disables them
+        '''
+        import numpy as np # for sample conversion
+        self._np = np
+
+        self.dtype, self.nValues = FORMATS[fmt]
+        self.fmt = fmt
+        self.avg = avg
+        self.decim = decim if fmt != 'f32' else 1
+        self.output = output
+        self.log = log
+        self.stats = stats
+        self.tag = RealtimeTag(self._report, samplerate/self.decim, timeout)
+
+        self._pending = None # raw values of samples still needed by the moving average of the next block
+        self._skip = 0 # samples to skip at the next block to keep the decimation phase
+        self.nSamples = 0 # samples processed
+        self.nCmds = 0 # commands received
+        self.nFailures = 0 # commands without message
+        self._tStats = perf_counter()
+        self._statSamples = self._statCmds = self._statFailures = 0
+    
+
+    def _report(self, cmd):
+        '''
+        Writes the records of a received command
+        '''
+        self.nCmds += 1
+        if not cmd.message:
+            self.nFailures += 1
+        if self.output:
+            self.output.write(json.dumps(commandRecord(cmd, self.decim), default=str)+'\n')
+            self.output.flush()
+        if self.log:
+            self.log.write([cmd])
+            self.log.flush()
+    
+
+    def process(self, data):
+        '''
+        Decodes raw bytes of complete samples. 
+        The moving average and decimation continue across blocks, 
+        so the decoded samples do not depend on the block size.
+
+        :param data: bytes
+        '''
+        values = self._np.frombuffer(data, self.dtype)
+        self.nSamples += len(values)//self.nValues
+        if self.fmt == 'u8':
+            values = values.astype(self._np.float32)-127.5
+        if self.fmt == 'f32':
+            samples = values
+        else:
+            samples = self._filter(values)
+        self.tag.process(samples.tolist())
+
+        # throughput statistics
+        tNow = perf_counter()
+        if self.stats and tNow-self._tStats >= self.stats:
+            dt = tNow-self._tStats
+            sys.stderr.write('{:.2f} MS/s, {:.1f} commands/s, {} failures, {} commands total\n'.format(
+                (self.nSamples-self._statSamples)/dt/1e6, (self.nCmds-self._statCmds)/dt,
+                self.nFailures-self._statFailures, self.nCmds))
+            self._tStats = tNow
+            self._statSamples, self._statCmds, self._statFailures = self.nSamples, self.nCmds, self.nFailures
+    
+
+    def _filter(self, values):
+        '''
+        Converts I/Q values to filtered and decimated magnitudes, 
+        continuing with the samples kept from the previous block
+
+        :param values: numpy array of I/Q values
+        :returns: numpy array of sample magnitudes
+        '''
+        np = self._np
+        if self._pending is not None:
+            values = np.concatenate((self._pending, values))
+        nTotal = len(values)//self.nValues
+        
+        # first output sample of this block at the decimation phase
+        iStart = self._skip
+        if iStart >= nTotal:
+            self._skip -= nTotal
+            self._pending = None
+            return np.empty(0, np.float32)
+        samples = iqToSamples(values[iStart*self.nValues:], self.avg, self.decim)
+        
+        # keep the samples of the next output sample or skip to it
+        iNext = iStart+len(samples)*self.decim
+        self._skip = max(iNext-nTotal, 0)
+        self._pending = values[iNext*self.nValues:].copy() if iNext < nTotal else None
+        return samples
+    
+
+    def run(self, stream, nBlock=1 << 16):
+        '''
+        Decodes a stream until its end
+
+        :param stream: binary stream, e.g. stdin, a FIFO or a file
+        :param nBlock: samples per block
+        '''
+        nBytes = self._np.dtype(self.dtype).itemsize*self.nValues
+        while True:
+            data = stream.read(nBlock*nBytes)
+            if not data:
+                break
+            nComplete = len(data)-len(data) % nBytes
+            if nComplete:
+                self.process(data[:nComplete])
+    
+
+    def finish(self):
+        '''
+        Reports a pending command at the end of all streams
+        '''
+        self.tag.flush()
+
+
+def main(args=None):
+    '''
+    Entry point of g2c1-decode
+    '''
+    parser = argparse.ArgumentParser(prog='g2c1-decode', description='Decodes Gen2 reader commands from raw sample streams')
+    parser.add_argument('inputs', nargs='*', default=['-'], help='sample files or FIFOs, "-" for stdin (default)')
+    parser.add_argument('-r', '--samplerate', type=float, required=True, help='sample rate in Hz')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), default='cf32', help='sample format (default: cf32)')
+    parser.add_argument('-a', '--avg', type=int, default=1, help='moving average length in samples (default: 1)')
+    parser.add_argument('-d', '--decim', type=int, default=1, help='decimation factor (default: 1)')
+    parser.add_argument('-t', '--timeout', type=float, help='command end after timeout x RTcal without edge (default: RTcal-Tari/2)')
+    parser.add_argument('-o', '--output', default='-', help='JSON lines file, "-" for stdout (default)')
+    parser.add_argument('-l', '--log', help='append binary command records to this log file instead of JSON lines')
+    parser.add_argument('-b', '--block', type=int, default=1 << 16, help='samples per block (default: 65536)')
+    parser.add_argument('-s', '--stats', type=float, default=10., help='statistics interval on stderr in s, 0 disables them (default: 10)')
+    args = parser.parse_args(args)
+
+    # prepare outputs
+    output = log = None
+    if args.log:
+        from .log import LogWriter
+        log = LogWriter(args.log)
+    else:
+        output = sys.stdout if args.output == '-' else open(args.output, 'a')
+
+    decoder = Decoder(args.samplerate, args.format, args.avg, args.decim, args.timeout, output, log, args.stats)
+    try:
+        for path in args.inputs:
+            if path == '-':
+                decoder.run(sys.stdin.buffer, args.block)
+            else:
+                with open(path, 'rb') as stream:
+                    decoder.run(stream, args.block)
+        decoder.finish()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if log:
+            log.close()
+        if output and output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
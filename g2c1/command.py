@@ -6,6 +6,8 @@ class Reader:
     Outputs a message as reader command pulses. 
     Pulses are durations in us, toggling power level, first low.
     '''
+    _templates = {} # shaped symbol samples by (tari, blf, dr, samplerate, depth, riseUs)
+
     def __init__(self, tariUs=12, blfMHz=0.32, port=None):
         '''
         :param tariUs: reader data-0 symbol length in us
@@ -107,6 +109,82 @@ class Reader:
         return pulses
     
 
+    def symbolTemplates(self, samplerate=2e6, dr=None, depth=0.9, riseUs=1.):
+        '''
+        Samples of the command symbols for DSB-ASK baseband, cached per parameter set.
+        Each symbol starts with the rising ramp from the preceeding low-pulse,
+        so concatenated templates join without overlap.
+        Durations are rounded to whole samples per template.
+
+        :param samplerate: sample rate in Hz
+        :param dr: divide ratio for the tag -> reader calibration symbol, None without
+        :param depth: modulation depth, low level is 1-depth
+        :param riseUs: 0...100 % rise and fall time in us with raised cosine shape
+        :returns: dict of numpy float32 arrays "delim", "data0", "data1", "rtCal", "end" and "trCal" if dr is given
+        '''
+        import numpy as np # for sample arrays
+
+        key = (self.tari, self.blf, dr, samplerate, depth, riseUs)
+        if key in self._templates:
+            return self._templates[key]
+        
+        low = 1.-depth
+        nRise = int(round(riseUs*1e-6*samplerate))
+        ramp = 0.5-0.5*np.cos(np.pi*(np.arange(nRise)+0.5)/nRise) # 0...1
+
+        def segment(nSamples, start, stop):
+            # level transition from start to stop at the begin, then constant
+            samples = np.full(nSamples, stop, np.float32)
+            n = min(nRise, nSamples)
+            samples[:n] = start+(stop-start)*ramp[:n]
+            return samples
+        
+        def symbol(pulses):
+            # high-pulse then low-pulse, edges on whole samples
+            nHigh = int(round(pulses[0]*1e-6*samplerate))
+            nTotal = int(round(sum(pulses)*1e-6*samplerate))
+            return np.concatenate((segment(nHigh, low, 1.), segment(nTotal-nHigh, 1., low)))
+        
+        rtCal = self.frameSync[3:5]
+        templates = {
+            'delim': segment(int(round(self.frameSync[0]*1e-6*samplerate)), 1., low),
+            'data0': symbol(self.data0),
+            'data1': symbol(self.data1),
+            'rtCal': symbol(rtCal),
+            'end': segment(max(nRise, 1), low, 1.)
+        }
+        if dr is not None:
+            templates['trCal'] = symbol(self.preamble(dr)[5:7])
+        
+        self._templates[key] = templates
+        return templates
+    
+
+    def toSamples(self, msg, samplerate=2e6, depth=0.9, riseUs=1.):
+        '''
+        Outputs a message as shaped DSB-ASK baseband samples (requires numpy).
+        Starts with the falling edge of the delimiter from CW level 1
+        and ends with the rising ramp back to it.
+
+        :param msg: message object
+        :param samplerate: sample rate in Hz
+        :param depth: modulation depth, low level is 1-depth
+        :param riseUs: 0...100 % rise and fall time in us with raised cosine shape
+        :returns: numpy float32 array of sample magnitudes
+        '''
+        import numpy as np # for concatenation
+
+        isQuery = isinstance(msg, Query)
+        templates = self.symbolTemplates(samplerate, msg.dr.value if isQuery else None, depth, riseUs)
+        data = (templates['data0'], templates['data1'])
+        parts = [templates['delim'], templates['data0'], templates['rtCal']]
+        if isQuery:
+            parts.append(templates['trCal'])
+        parts.extend(data[bit] for bit in msg.toBits())
+        parts.append(templates['end'])
+        return np.concatenate(parts)
+    
+
     def sendBytes(self, msgBytes):
         '''
         Sends bytes via serial port and awaits confirmation
@@ -0,0 +1,112 @@
+from .messages import Query, QueryAdjust, QueryRep, ACK # to follow inventory rounds
+
+'''
+Reconstruction of inventory rounds from received reader commands
+'''
+
+
+class InventoryRound:
+    '''
+    Summary of an inventory round in a session
+    '''
+    def __init__(self, session, q, start):
+        '''
+        :param session: session of the round
+        :param q: Q of the query starting the round
+        :param start: begin of the query in us
+        '''
+        self.session = session
+        self.q = q # Q of the query starting the round
+        self.qFinal = q # Q after all query adjusts
+        self.start = start # begin of round in us
+        self.end = start # end of last command of round in us
+        self.slots = 1 # number of slots used, the query opens the first one
+        self.adjusts = 0 # number of query adjusts
+        self.rns = [] # acknowledged RN16s
+    
+
+    def __repr__(self):
+        return '{}(session={}, q={}, slots={}, acks={}, duration={:.0f}us)'.format(
+            self.__class__.__name__, self.session, self.q, self.slots, self.acks, self.duration)
+    
+
+    @property
+    def acks(self):
+        '''
+        :returns: number of acknowledged tags
+        '''
+        return len(self.rns)
+    
+
+    @property
+    def duration(self):
+        '''
+        :returns: duration of the round in us
+        '''
+        return self.end-self.start
+    
+
+    @property
+    def readRate(self):
+        '''
+        :returns: acknowledged tags per second
+        '''
+        return 1e6*self.acks/self.duration if self.duration else 0.
+
+
+class InventoryTracker:
+    '''
+    Follows inventory rounds per session, one received command at a time
+    '''
+    def __init__(self):
+        self.rounds = {} # running round per session
+        self.session = None # session of the last inventory command, ACKs refer to it
+    
+
+    def add(self, cmd, offset=0.):
+        '''
+        Updates the rounds with a received command
+
+        :param cmd: received command
+        :param offset: time in us added to the command start and end,
+            e.g. to place commands of consecutive captures on a common time axis
+        :returns: round finished by the command or None
+        '''
+        msg = cmd.message
+        finished = None
+        if isinstance(msg, Query):
+            # new round, replaces running round of session
+            finished = self.rounds.get(msg.session.value)
+            self.session = msg.session.value
+            self.rounds[self.session] = InventoryRound(self.session, msg.q.value, offset+cmd.start)
+        elif isinstance(msg, (QueryRep, QueryAdjust)):
+            self.session = msg.session.value
+            rnd = self.rounds.get(self.session)
+            if not rnd:
+                return None # round started before capture
+            rnd.slots += 1
+            if isinstance(msg, QueryAdjust):
+                rnd.adjusts += 1
+                rnd.qFinal = min(max(rnd.qFinal+(msg.upDn.value or 0), 0), 15)
+        elif isinstance(msg, ACK):
+            rnd = self.rounds.get(self.session)
+            if not rnd:
+                return None
+            rnd.rns.append(msg.rn.value)
+        else:
+            return None
+
+        self.rounds[self.session].end = offset+cmd.end
+        return finished
+    
+
+    def finish(self):
+        '''
+        Finishes all running rounds, e.g. at the end of a capture
+
+        :returns: list of finished rounds
+        '''
+        finished = list(self.rounds.values())
+        self.rounds = {}
+        self.session = None
+        return finished
@@ -0,0 +1,271 @@
+import os # to get file sizes
+import struct # to pack fixed-width records
+
+'''
+Compact append-only binary log of received commands
+'''
+
+MAGIC = b'G2C1LOG1' # file header
+RECORD = struct.Struct('<ddffffBBHQI48s') # start, end, tari, rtCal, trCal, blf, type, crc, nBits, edge index, number of edges, bits
+MAX_BITS = 8*48 # maximum number of command bits per record
+
+# command type names indexed by their code in the log, only append new types to keep old logs readable
+TYPES = ('Query', 'QueryAdjust', 'QueryRep', 'ACK', 'NAK', 'Select', 'ReqRN', 'Read', 'Write')
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+TYPE_UNKNOWN = 255 # command type of commands without message
+
+CRC_NONE = 0 # command type without checksum or unknown type
+CRC_VALID = 1
+CRC_INVALID = 2
+
+
+_checksums = {} # checksum function by message type
+
+
+def crcStatus(cmd):
+    '''
+    Checks the checksum at the end of the bits of a received command 
+    without building its message
+
+    :param cmd: received command
+    :returns: CRC_NONE, CRC_VALID or CRC_INVALID (CRC_NONE for unknown types and types without checksum)
+    '''
+    if not cmd.msgType:
+        return CRC_NONE
+    if cmd.msgType not in _checksums:
+        _checksums[cmd.msgType] = cmd.msgType().checksumFunc
+    checksumFunc = _checksums[cmd.msgType]
+    if not checksumFunc:
+        return CRC_NONE
+
+    bits = list(cmd.bits)
+    nCrc = len(checksumFunc([]))
+    if len(bits) <= nCrc:
+        return CRC_INVALID
+    return CRC_VALID if checksumFunc(bits[:-nCrc]) == bits[-nCrc:] else CRC_INVALID
+
+
+class LogWriter:
+    '''
+    Appends received commands as fixed-width records to a log file.
+    Raw edges optionally go to a side file with the suffix ".edges".
+    '''
+    def __init__(self, path, edges=False):
+        '''
+        :param path: log file path, existing logs are appended 
+            after removing an incomplete last record of an interrupted writer
+        :param edges: when set to True, the raw edge durations of the commands are stored as well
+        '''
+        nEdges = self._repair(path)
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+        self.edgeFile = None
+        self.nEdges = nEdges # number of edges in side file, also continued by records without edges
+        if edges:
+            self.edgeFile = open(path+'.edges', 'ab')
+            if self.edgeFile.tell() != 4*nEdges:
+                self.close()
+                raise IOError('Edges in {}.edges do not match the command log'.format(path))
+    
+
+    @staticmethod
+    def _repair(path):
+        '''
+        Truncates an existing log and its edges to the last complete record
+
+        :param path: log file path
+        :returns: number of edges referenced by the records
+        '''
+        if not os.path.exists(path):
+            return 0
+        
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC[:len(magic)]:
+                raise IOError('{} is not a valid command log'.format(path))
+            if size < len(MAGIC):
+                os.truncate(path, 0) # interrupted while writing the header
+                return 0
+            
+            # drop trailing records with edges missing in the side file, both files are buffered independently
+            edgePath = path+'.edges'
+            nSaved = os.path.getsize(edgePath)//4 if os.path.exists(edgePath) else None
+            nRecords = (size-len(MAGIC))//RECORD.size
+            nEdges = 0
+            while nRecords:
+                f.seek(len(MAGIC)+(nRecords-1)*RECORD.size)
+                record = RECORD.unpack(f.read(RECORD.size))
+                nEdges = record[9]+record[10] # edges up to the last one of the last record
+                if nSaved is None or nEdges <= nSaved:
+                    break
+                nRecords -= 1
+                nEdges = 0
+            if size != len(MAGIC)+nRecords*RECORD.size:
+                os.truncate(path, len(MAGIC)+nRecords*RECORD.size)
+        
+        # edges are written before their record
+        if nSaved is not None and os.path.getsize(edgePath) > 4*nEdges:
+            os.truncate(edgePath, 4*nEdges)
+        return nEdges
+    
+
+    def __del__(self):
+        self.close()
+    
+
+    def __enter__(self):
+        return self
+    
+
+    def __exit__(self, *args):
+        self.close()
+    
+
+    def write(self, cmds, offset=0.):
+        '''
+        Appends received commands
+
+        :param cmds: list of received commands
+        :param offset: time in us added to the command start and end,
+            e.g. to place commands of consecutive captures on a common time axis
+        '''
+        for cmd in cmds:
+            bits = cmd.bits
+            nBits = len(bits)
+            if nBits > MAX_BITS:
+                raise ValueError('Command with {} bits too long for log'.format(nBits))
+
+            # command type and packed bits
+            iType = TYPE_CODES.get(cmd.msgType.__name__, TYPE_UNKNOWN) if cmd.msgType else TYPE_UNKNOWN
+            packed = int(''.join(str(b) for b in bits), 2) << (MAX_BITS-nBits) if nBits else 0
+
+            # optionally raw edges
+            iEdge = self.nEdges
+            nEdges = 0
+            if self.edgeFile:
+                nEdges = len(cmd.edges)
+                self.edgeFile.write(struct.pack('<{}f'.format(nEdges), *cmd.edges))
+                self.nEdges += nEdges
+
+            nan = float('nan')
+            self.file.write(RECORD.pack(
+                offset+cmd.start,
+                offset+cmd.end,
+                cmd.tari or nan,
+                cmd.rtCal or nan,
+                cmd.trCal or nan,
+                cmd.blf or nan,
+                iType,
+                crcStatus(cmd),
+                nBits,
+                iEdge,
+                nEdges,
+                packed.to_bytes(MAX_BITS//8, 'big')))
+    
+
+    def flush(self):
+        '''
+        Writes buffered records to disk
+        '''
+        self.file.flush()
+        if self.edgeFile:
+            self.edgeFile.flush()
+    
+
+    def close(self):
+        '''
+        Closes the log files
+        '''
+        for f in (getattr(self, 'file', None), getattr(self, 'edgeFile', None)):
+            if f:
+                f.close()
+
+
+class LogReader:
+    '''
+    Memory-maps a command log and exposes its columns as numpy arrays (requires numpy)
+    '''
+    def __init__(self, path):
+        '''
+        :param path: log file path
+        '''
+        import numpy as np # only needed for reading logs
+        self._np = np
+
+        dtype = np.dtype([
+            ('start', '<f8'),
+            ('end', '<f8'),
+            ('tari', '<f4'),
+            ('rtCal', '<f4'),
+            ('trCal', '<f4'),
+            ('blf', '<f4'),
+            ('type', 'u1'),
+            ('crc', 'u1'),
+            ('nBits', '<u2'),
+            ('iEdge', '<u8'),
+            ('nEdges', '<u4'),
+            ('bits', 'u1', (MAX_BITS//8,))])
+
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise IOError('{} is not a valid command log'.format(path))
+
+        # map complete records only, a writer may still be appending
+        nRecords = (os.path.getsize(path)-len(MAGIC))//RECORD.size
+        self.records = np.memmap(path, dtype, 'r', len(MAGIC), (nRecords,)) if nRecords else np.zeros(0, dtype)
+        self.edges = None # raw edge durations in us of all commands
+        if os.path.exists(path+'.edges'):
+            nEdges = os.path.getsize(path+'.edges')//4
+            self.edges = np.memmap(path+'.edges', '<f4', 'r', 0, (nEdges,)) if nEdges else np.zeros(0, '<f4')
+    
+
+    def __len__(self):
+        return len(self.records)
+    
+
+    def __getitem__(self, name):
+        '''
+        :param name: column name, e.g. "start", "tari", "type" or "crc"
+        :returns: numpy array
+        '''
+        return self.records[name]
+    
+
+    def between(self, start, end):
+        '''
+        Selects commands in a time range,
+        requires commands to be written in chronological order
+
+        :param start: earliest command start in us
+        :param end: latest command start in us
+        :returns: numpy record array of the selected commands
+        '''
+        starts = self.records['start']
+        iStart = self._np.searchsorted(starts, start, 'left')
+        iEnd = self._np.searchsorted(starts, end, 'right')
+        return self.records[iStart:iEnd]
+    
+
+    def bits(self, record):
+        '''
+        :param record: record or index of command
+        :returns: list of 0/1 ints of the command
+        '''
+        if not isinstance(record, self._np.void):
+            record = self.records[record]
+        return [int(b) for b in self._np.unpackbits(record['bits'])[:record['nBits']]]
+    
+
+    def commandEdges(self, record):
+        '''
+        :param record: record or index of command
+        :returns: numpy array of the raw edge durations in us of the command
+        '''
+        if self.edges is None:
+            raise AttributeError('Log was written without edges')
+        if not isinstance(record, self._np.void):
+            record = self.records[record]
+        return self.edges[record['iEdge']:record['iEdge']+record['nEdges']]
@@ -1,4 +1,4 @@
-from .base import Constant, LookUp, Value, Message, crc5 # to generate message bits and checksum
+from .base import Constant, LookUp, Value, EBV, Mask, Message, crc5, crc16 # to generate message bits and checksum
 
 '''
 Messages according to EPCglobal Gen2 Specifications v2.0.0
@@ -173,15 +173,208 @@ class NAK(Message):
         self.add(self.cmd)
 
 
+def _memBank(memBank):
+    '''
+    Makes the memory bank part of access commands
+
+    :param memBank: current/default memory bank
+    :returns: look up part
+    '''
+    part = LookUp(2, memBank)
+    part.add([0, 0], 'reserved')
+    part.add([0, 1], 'epc')
+    part.add([1, 0], 'tid')
+    part.add([1, 1], 'user')
+    return part
+
+
+class Select(Message):
+    '''
+    Reader selects a tag population by a memory mask
+    6.3.2.12.1.1
+    '''
+    cmd = Constant([1, 0, 1, 0], 'Select')
+
+    def __init__(self, target='sl', action=0, memBank='epc', pointer=32, mask=None, truncate=False):
+        '''
+        :param target: flag modified by the select.
+            Can be "s0", "s1", "s2", "s3" (inventoried flag of session) or "sl"
+        :param action: how matching and non-matching tags modify the flag.
+            Can be 0...7
+        :param memBank: memory bank the mask applies to.
+            Can be "reserved" (file type), "epc", "tid" or "user"
+        :param pointer: starting bit address of the mask in the memory bank
+        :param mask: list of 0/1 ints to compare with the memory (up to 255 bits)
+        :param truncate: tags backscatter only their EPC part following the mask.
+            Can be True or False
+        '''
+        Message.__init__(self, crc16)
+        # add parts
+
+        # command
+        self.add(self.cmd)
+
+        # target
+        self.target = LookUp(3, target)
+        self.target.add([0, 0, 0], 's0')
+        self.target.add([0, 0, 1], 's1')
+        self.target.add([0, 1, 0], 's2')
+        self.target.add([0, 1, 1], 's3')
+        self.target.add([1, 0, 0], 'sl')
+        self.add(self.target)
+
+        # action
+        self.action = Value(3, action)
+        self.add(self.action)
+
+        # memory bank
+        self.memBank = _memBank(memBank)
+        self.add(self.memBank)
+
+        # pointer
+        self.pointer = EBV(pointer)
+        self.add(self.pointer)
+
+        # length and mask
+        self.mask = Mask([] if mask is None else mask)
+        self.add(self.mask)
+
+        # truncate
+        self.truncate = LookUp(1, truncate)
+        self.truncate.add([0], False)
+        self.truncate.add([1], True)
+        self.add(self.truncate)
+
+
+class ReqRN(Message):
+    '''
+    Reader requests a new RN16 or handle from a tag
+    6.3.2.12.3.1
+    '''
+    cmd = Constant([1, 1, 0, 0, 0, 0, 0, 1], 'Req_RN')
+
+    def __init__(self, rn=0):
+        '''
+        :param rn: tag's RN16 or handle
+        '''
+        Message.__init__(self, crc16)
+        # add parts
+
+        # command
+        self.add(self.cmd)
+
+        # RN16
+        self.rn = Value(16, rn)
+        self.add(self.rn)
+
+
+class Read(Message):
+    '''
+    Reader reads words from a tag's memory bank
+    6.3.2.12.3.2
+    '''
+    cmd = Constant([1, 1, 0, 0, 0, 0, 1, 0], 'Read')
+
+    def __init__(self, memBank='epc', wordPtr=0, wordCount=0, rn=0):
+        '''
+        :param memBank: memory bank to read from.
+            Can be "reserved", "epc", "tid" or "user"
+        :param wordPtr: starting word address
+        :param wordCount: number of 16 bit words to read (0 reads the whole bank)
+        :param rn: tag's handle
+        '''
+        Message.__init__(self, crc16)
+        # add parts
+
+        # command
+        self.add(self.cmd)
+
+        # memory bank
+        self.memBank = _memBank(memBank)
+        self.add(self.memBank)
+
+        # word pointer
+        self.wordPtr = EBV(wordPtr)
+        self.add(self.wordPtr)
+
+        # word count
+        self.wordCount = Value(8, wordCount)
+        self.add(self.wordCount)
+
+        # handle
+        self.rn = Value(16, rn)
+        self.add(self.rn)
+
+
+class Write(Message):
+    '''
+    Reader writes a word to a tag's memory bank
+    6.3.2.12.3.3
+    '''
+    cmd = Constant([1, 1, 0, 0, 0, 0, 1, 1], 'Write')
+
+    def __init__(self, memBank='epc', wordPtr=0, data=0, rn=0):
+        '''
+        :param memBank: memory bank to write to.
+            Can be "reserved", "epc", "tid" or "user"
+        :param wordPtr: word address
+        :param data: 16 bit word to write (already cover-coded with a RN16)
+        :param rn: tag's handle
+        '''
+        Message.__init__(self, crc16)
+        # add parts
+
+        # command
+        self.add(self.cmd)
+
+        # memory bank
+        self.memBank = _memBank(memBank)
+        self.add(self.memBank)
+
+        # word pointer
+        self.wordPtr = EBV(wordPtr)
+        self.add(self.wordPtr)
+
+        # data
+        self.data = Value(16, data)
+        self.add(self.data)
+
+        # handle
+        self.rn = Value(16, rn)
+        self.add(self.rn)
+
+
 _messages = (
     Query, 
     QueryAdjust, 
     QueryRep, 
     ACK, 
-    NAK
+    NAK, 
+    Select, 
+    ReqRN, 
+    Read, 
+    Write
 )
 
 
+_cmdBits = tuple((Msg.cmd.toBits(), Msg) for Msg in _messages) # command IDs to look up message types
+
+
+def typeFromBits(bits):
+    '''
+    Looks up message type from the command ID at the begin of bits
+
+    :param bits: list of 0/1 ints
+    :returns: message class or None if no type found
+    '''
+    for cmdBits, Msg in _cmdBits:
+        # check if command ID in bits
+        if len(bits) >= len(cmdBits) and cmdBits == bits[:len(cmdBits)]:
+            return Msg
+    
+    return None
+
+
 def fromBits(bits):
     '''
     Looks up message from bits
@@ -189,15 +382,11 @@ def fromBits(bits):
     :param bits: list of 0/1 ints
     :returns: instance of message
     '''
-    for Msg in _messages:
-        cmdBits = Msg.cmd.toBits()
-        nCmdBits = len(cmdBits)
-        # check if command ID in bits
-        if len(bits) >= nCmdBits:
-            if cmdBits == bits[:nCmdBits]:
-                # build message from bits
-                msg = Msg()
-                msg.fromBits(bits)
-                return msg
+    Msg = typeFromBits(bits)
+    if not Msg:
+        raise LookupError('No message type found associated with {}'.format(bits))
     
-    raise LookupError('No message type found associated with {}'.format(bits))
+    # build message from bits
+    msg = Msg()
+    msg.fromBits(bits)
+    return msg
@@ -1,20 +1,87 @@
-from .messages import Query, fromBits # to get type of special message
+from array import array # for compact sample indices
+from math import exp # for decaying trigger levels
+from time import perf_counter # to measure decoding latency
+from .backend import accelerated # to dispatch to the selected compute backend
+from .base import iqToSamples # to convert IQ samples to magnitudes
+from .messages import Query, typeFromBits # to get type of special message
 
 
 class ReceivedCommand:
     '''
     Meta infos and parsed message from a reader command
     '''
-    def __init__(self):
+    def __init__(self, types=None):
+        '''
+        :param types: message classes to build the message for, None for all types
+        '''
         self.tari = None # data-0 length in us
         self.rtCal = None # reader -> tag calibration symbol length in us
         self.trCal = None # tag -> reader calibration symbol length in us
         self.edges = [] # durations between raising edges of the command in us
         self.bits = [] # parsed command data bits
-        self.message = None # command message object
-        self.blf = None # backscatter frequency in MHz
+        self.msgType = None # command message class, looked up from the command ID
+        self.types = types
         self.start = 0. # begin of command in us
         self.end = 0. # end of command in us
+        self.sampleStart = None # absolute index of the first sample of the command
+        self.sampleEnd = None # absolute index after the last sample of the command
+        self.latency = None # duration in s from receiving the deciding samples until reporting (real-time mode)
+        self._message = None
+        self._parsed = False # message was built or tried to be built
+    
+
+    @property
+    def message(self):
+        '''
+        Command message object, built from the bits on first access
+
+        :returns: message or None if type unknown, filtered or bits invalid
+        '''
+        if not self._parsed:
+            self._parsed = True
+            if self.msgType and (self.types is None or self.msgType in self.types):
+                msg = self.msgType()
+                try:
+                    msg.fromBits(self.bits)
+                except:
+                    print('Could not build {} from bits {} (edges: {})'.format(
+                        self.msgType.__name__, self.bits, ', '.join('{:.1f}'.format(e) for e in self.edges)))
+                else:
+                    self._message = msg
+        
+        return self._message
+    
+
+    @message.setter
+    def message(self, msg):
+        self._message = msg
+        self._parsed = True
+    
+
+    @property
+    def blf(self):
+        '''
+        Backscatter frequency, if command was a Query
+
+        :returns: frequency in MHz or None
+        '''
+        if self.trCal and self.msgType is Query and len(self.bits) > 4:
+            dr = 64/3 if self.bits[4] else 8 # divide ratio bit after the command ID, without building the message
+            return dr/self.trCal
+        return None
+    
+
+    def sampleView(self, samples):
+        '''
+        Selects the samples of the command from the capture, 
+        e.g. a memory-mapped numpy array of the whole recording
+
+        :param samples: samples the edges were detected in, starting at absolute index 0
+        :returns: slice of samples (a view without copy for numpy arrays)
+        '''
+        if self.sampleStart is None:
+            raise AttributeError('Command has no sample indices, pass edge indices when parsing')
+        return samples[self.sampleStart:self.sampleEnd]
 
 
 class Tag:
@@ -26,21 +93,30 @@ class Tag:
     MAX_TARI = 25
 
 
-    def samplesToEdges(self, samples, samplerate=1e6, mid=0.4):
+    def __init__(self):
+        # absolute sample indices of the first sample and the raising edges from the last edge detection
+        self.edgeIndices = array('q')
+    
+
+    @accelerated
+    def samplesToEdges(self, samples, samplerate=1e6, mid=0.4, offset=0, levels=None, hyst=0.1):
         '''
-        Converts sample magnitudes to raising edge durations
+        Converts sample magnitudes to raising edge durations. 
+        The absolute sample indices of the first sample and each raising edge 
+        are kept in edgeIndices.
 
         :param samples: list of sample magnitudes
         :param samplerate: sample rate in Hz
         :param mid: ratio (0=low...1=high) to define middle level
+        :param offset: absolute index of the first sample, e.g. the block start in a capture
+        :param levels: (low, high) level tuple, defaults to the minimum and maximum of the samples
+        :param hyst: hysteresis around the middle level relative to the level difference
         :returns: list of durations in us
         '''
-        sMin = min(samples)
-        sMax = max(samples)
+        sMin, sMax = levels if levels else (min(samples), max(samples))
         
         # prepare schmitt trigger
         delta = sMax-sMin
-        hyst = 0.1
         threshMid = sMin+mid*delta
         threshHigh = threshMid+hyst*delta
         threshLow = threshMid-hyst*delta
@@ -48,6 +124,7 @@ class Tag:
 
         # get raising edges
         edges = []
+        self.edgeIndices = array('q', [offset])
         iOldRaising = 0
         for iSample, level in enumerate(samples):
             if level > threshHigh and not raised:
@@ -56,30 +133,61 @@ class Tag:
                 edge = 1e6*(iSample-iOldRaising)/samplerate
                 iOldRaising = iSample
                 edges.append(edge)
+                self.edgeIndices.append(offset+iSample)
             if level < threshLow and raised:
                 raised = False
         
         return edges
     
 
-    def fromEdges(self, edges):
+    def iqToEdges(self, iq, samplerate=1e6, avg=1, decim=1, mid=0.4, offset=0):
+        '''
+        Converts complex IQ samples to raising edge durations 
+        by computing the filtered and decimated envelope first. 
+        The edgeIndices refer to IQ samples with the resolution of the decimation.
+
+        :param iq: array of complex IQ samples or interleaved int16 I/Q values
+        :param samplerate: sample rate of the IQ samples in Hz
+        :param avg: length of the moving average filter in samples
+        :param decim: decimation factor
+        :param mid: ratio (0=low...1=high) to define middle level
+        :param offset: absolute index of the first IQ sample
+        :returns: list of durations in us
+        '''
+        samples = iqToSamples(iq, avg, decim)
+        edges = self.samplesToEdges(samples, samplerate/decim, mid)
+        self.edgeIndices = array('q', (offset+decim*i for i in self.edgeIndices))
+        return edges
+    
+
+    def fromEdges(self, edges, types=None, edgeIndices=None):
         '''
         Parses durations between raising edges from reader pulses 
-        to collect the data bits, meta infos and corresponding messages
+        to collect the data bits, meta infos and corresponding messages. 
+        Messages are built on first access of the commands' message.
 
         :param edges: list of durations in us
+        :param types: message classes to build messages for, e.g. (Query, ACK). 
+            Other commands only get their message type. None builds all messages.
+        :param edgeIndices: absolute sample indices of the first sample and the edges 
+            (edgeIndices of the edge detection) to set the commands' sample span
         :returns: list of received commands
         '''
         cmds = []
-        cmd = ReceivedCommand()
+        cmd = ReceivedCommand(types)
         def finish():
             if cmd.rtCal:
-                cmd.end = sum(edges[:iEdge])
+                cmd.end = tNew
                 cmd.edges = edges[iStart:iEdge]
+                if edgeIndices is not None:
+                    cmd.sampleStart = edgeIndices[iStart]
+                    cmd.sampleEnd = edgeIndices[iEdge]
                 cmds.append(cmd) # collect finished command
 
         # get command data bits and meta infos
         dNew = 0.
+        tOld = tNew = 0. # sum of durations before previous and current edge
+        iEdge = -1
         for iEdge, edge in enumerate(edges):
             dOld = dNew
             dNew = edge
@@ -89,7 +197,7 @@ class Tag:
                     cmd.tari = dOld # get tari
                     cmd.rtCal = dNew # valid rtCal duration
                     iStart = iEdge-1
-                    cmd.start = sum(edges[:iStart]) # get command start
+                    cmd.start = tOld # get command start
             else:
                 # wait either for tag -> reader calibration symbol OR data
                 if not cmd.trCal and cmd.rtCal <= dNew <= 3*cmd.rtCal:
@@ -98,27 +206,393 @@ class Tag:
                     if cmd.bits and dNew > cmd.rtCal:
                         # end of command
                         finish()
-                        cmd = ReceivedCommand() # make new command
+                        cmd = ReceivedCommand(types) # make new command
                     else:
                         cmd.bits.append(1 if dNew > cmd.rtCal/2 else 0) # data
+            tOld, tNew = tNew, tNew+edge
         
         # collect finished command
         iEdge += 1
         finish()
 
-        # convert command data bits to messages
+        self._lookupTypes(cmds)
+        return cmds
+    
+
+    def findFrameSyncs(self, samples, samplerate=1e6, threshold=0.7, taris=None, rtCalRatios=(2.5, 3., 3.5), decim=None, nFFT=1 << 14):
+        '''
+        Finds reader commands by normalized correlation of the samples with frame-sync templates 
+        (delimiter, data-0, rtCal) using FFT block correlation (requires numpy). 
+        Unlike fromEdges, single spurious edges do not hide the frame-sync. 
+        All local maxima are returned, including matches inside data which fromFrameSyncs skips. 
+        The tari and rtCal of the best template are on the template grid, 
+        so they only approximate the command's ones.
+
+        :param samples: list of sample magnitudes
+        :param samplerate: sample rate in Hz
+        :param threshold: minimum normalized correlation (0...1) of a frame-sync
+        :param taris: list of data-0 lengths in us to search for, 
+            defaults to steps of 15 % between MIN_TARI and MAX_TARI
+        :param rtCalRatios: rtCal lengths to search for in multiples of tari
+        :param decim: samples averaged before correlation, defaults to a correlation rate of about 0.5 MHz
+        :param nFFT: block length of the correlation
+        :returns: list of (index of delimiter start, tari in us, rtCal in us, correlation) tuples
+        '''
+        import numpy as np # for FFT correlation
+
+        if taris is None:
+            nTaris = int(np.ceil(np.log(self.MAX_TARI/self.MIN_TARI)/np.log(1.15)))+1
+            taris = np.geomspace(self.MIN_TARI, self.MAX_TARI, nTaris)
+        if decim is None:
+            decim = max(1, int(samplerate/0.5e6))
+        
+        # average blocks of samples
+        samples = np.asarray(samples, dtype=float)
+        samples = samples[:len(samples)//decim*decim].reshape(-1, decim).mean(axis=1)
+        rate = samplerate/decim
+        
+        # zero mean templates of CW, delimiter, data-0 and rtCal with unit norm. 
+        # CW for a rtCal is longer than any data symbol's high level.
+        params = [(tari, ratio*tari) for tari in taris for ratio in rtCalRatios]
+        templates = []
+        leads = [] # template samples before delimiter
+        for tari, rtCal in params:
+            pw = 0.5*tari
+            pulses = [rtCal, 12.5, tari-pw, pw, rtCal-pw, pw, pw] # high first, ends with high level
+            bounds = np.cumsum(pulses)*1e-6*rate
+            iPulse = np.searchsorted(bounds, np.arange(int(bounds[-1]))+0.5, 'right')
+            template = np.where(iPulse % 2, -1., 1.)
+            leads.append(int(round(bounds[0])))
+            template -= template.mean()
+            templates.append(template/np.linalg.norm(template))
+        nTemplates = np.array([len(t) for t in templates])
+        nTemplate = nTemplates.max()
+        if nFFT < 2*nTemplate:
+            nFFT = 1 << int(np.ceil(np.log2(2*nTemplate)))
+        spectra = np.conj(np.array([np.fft.rfft(t, nFFT) for t in templates]))
+
+        # sums over the windows of each template length for normalization
+        padded = np.concatenate((samples, np.zeros(nTemplate)))
+        cumSum = np.concatenate(([0.], np.cumsum(padded)))
+        cumSumSq = np.concatenate(([0.], np.cumsum(padded**2)))
+
+        # overlap-save block correlation, keeping best template per sample
+        nStep = nFFT-nTemplate+1
+        scores = np.empty(len(samples))
+        iBest = np.empty(len(samples), dtype=np.int64)
+        for iBlock in range(0, len(samples), nStep):
+            n = min(nStep, len(samples)-iBlock)
+            corrs = np.fft.irfft(np.fft.rfft(padded[iBlock:iBlock+nFFT], nFFT)*spectra, nFFT)[:, :n]
+            
+            # normalize by the energy of the zero mean sample window
+            iWin = iBlock+np.arange(n)
+            sums = cumSum[iWin+nTemplates[:, None]]-cumSum[iWin]
+            sumsSq = cumSumSq[iWin+nTemplates[:, None]]-cumSumSq[iWin]
+            energy = np.maximum(sumsSq-sums**2/nTemplates[:, None], 0.)
+            corrs = np.divide(corrs, np.sqrt(energy), out=np.zeros_like(corrs), where=energy > 1e-12*nTemplates[:, None])
+            
+            iBest[iBlock:iBlock+n] = np.argmax(corrs, axis=0)
+            scores[iBlock:iBlock+n] = corrs[iBest[iBlock:iBlock+n], np.arange(n)]
+        
+        # local maxima above threshold at least a delimiter apart. 
+        # Runs above threshold can reach from a frame-sync into the data of long taris, 
+        # so they may contain a frame-sync before a better match inside data.
+        nSep = max(int(12.5e-6*rate), 1)
+        padded = np.concatenate((np.full(nSep, -np.inf), scores, np.full(nSep, -np.inf)))
+        maxima = np.lib.stride_tricks.sliding_window_view(padded, 2*nSep+1).max(axis=1)
+        syncs = []
+        for iSync in np.flatnonzero((scores >= threshold) & (scores == maxima)).tolist():
+            tari, rtCal = params[iBest[iSync]]
+            sync = ((iSync+leads[iBest[iSync]])*decim, float(tari), float(rtCal), float(scores[iSync]))
+            if syncs and sync[0]-syncs[-1][0] < nSep*decim:
+                # equal maxima of same frame-sync
+                if sync[3] > syncs[-1][3]:
+                    syncs[-1] = sync
+                continue
+            syncs.append(sync)
+        
+        return syncs
+    
+
+    def fromFrameSyncs(self, samples, syncs, samplerate=1e6, mid=0.4, types=None, offset=0, minDepth=0.2):
+        '''
+        Parses reader commands starting at found frame-syncs (requires numpy). 
+        The frame-syncs only anchor the commands: the thresholds come from the carrier before 
+        and the delimiter of each frame-sync, tari and rtCal are measured from the raising edges 
+        ending the delimiter, data-0 and rtCal, and the bits from the edges after them. 
+        Frame-syncs without level swing, without the raising edge ending rtCal at the expected position 
+        or inside an already parsed command are skipped.
+
+        :param samples: list of sample magnitudes
+        :param syncs: frame-syncs found by findFrameSyncs in the samples
+        :param samplerate: sample rate in Hz
+        :param mid: ratio (0=low...1=high) to define middle level
+        :param types: message classes to build messages for, None for all
+        :param offset: absolute index of the first sample
+        :param minDepth: minimum difference of carrier and delimiter level relative to the carrier level
+        :returns: list of received commands
+        '''
+        import numpy as np # for level estimation
+
+        samples = np.asarray(samples)
+        nDelim = int(12.5e-6*samplerate)
+        
+        # validate frame-syncs by their levels and the raising edge ending rtCal
+        valid = []
+        for iDelim, tari, rtCal, _ in syncs:
+            nTari = int(round(tari*1e-6*samplerate))
+            nRtCal = int(round(rtCal*1e-6*samplerate))
+            cw = samples[max(iDelim-nRtCal, 0):iDelim]
+            delim = samples[iDelim+nDelim//4:iDelim+nDelim-nDelim//4]
+            if not len(cw) or not len(delim):
+                continue
+            high = float(np.median(cw))
+            low = float(np.median(delim))
+            threshMid = low+mid*(high-low)
+            if high-low < minDepth*high or np.mean(cw > threshMid) < 0.9 or np.mean(delim < threshMid) < 0.9:
+                continue # no carrier and delimiter around the frame-sync, e.g. inside data
+            
+            # hysteresis above the carrier noise, but thresholds between the levels
+            noise = 1.4826*float(np.median(np.abs(cw-high)))
+            hyst = min(max(0.1, 2*noise/(high-low)), 0.9*min(mid, 1-mid))
+            
+            # raising edge closest to the expected rtCal end, starting in the delimiter
+            iFirst = iDelim+nDelim//2
+            iExpected = iDelim+nDelim+nTari+nRtCal
+            nTol = max(nTari//2, 1)
+            self.samplesToEdges(samples[iFirst:iExpected+nTol+1], samplerate, mid, iFirst, (low, high), hyst)
+            iRaisings = self.edgeIndices[1:]
+            iNear = [i for i in iRaisings if abs(i-iExpected) <= nTol]
+            if not iNear:
+                continue
+            iRtCalEnd = min(iNear, key=lambda i: abs(i-iExpected))
+            
+            # measure rtCal from the raising edge ending data-0 and tari from the one ending the delimiter
+            iBefore = [i for i in iRaisings if i < iRtCalEnd]
+            if len(iBefore) < 2:
+                continue
+            rtCal = 1e6*(iRtCalEnd-iBefore[-1])/samplerate
+            measured = 1e6*(iBefore[-1]-iBefore[0])/samplerate
+            if self.MIN_TARI <= measured <= self.MAX_TARI and 2*measured <= rtCal <= 3.5*measured:
+                tari = measured # otherwise a spurious edge in the delimiter, keep tari of the template
+            valid.append((iDelim, iRtCalEnd, tari, rtCal, (low, high), hyst))
+        
+        cmds = []
+        iCmdEnd = 0 # index after the last parsed command
+        iSync = 0
+        while iSync < len(valid):
+            iDelim, iRtCalEnd, tari, rtCal, levels, hyst = valid[iSync]
+            iSync += 1
+            if iDelim < iCmdEnd:
+                continue # frame-sync inside data of the previous command
+            
+            # edges from the raising edge ending rtCal until the delimiter end of the next frame-sync. 
+            # A command using all of them was cut by a frame-sync inside its data, so skip that one.
+            while True:
+                iNext = valid[iSync][0]+2*nDelim if iSync < len(valid) else len(samples)
+                edges = self.samplesToEdges(samples[iRtCalEnd:iNext], samplerate, mid, offset+iRtCalEnd, levels, hyst)
+                edgeIndices = array('q', [offset+iRtCalEnd-int(round((rtCal+tari)*1e-6*samplerate)), 
+                    offset+iRtCalEnd-int(round(rtCal*1e-6*samplerate))])
+                edgeIndices.extend(self.edgeIndices[1:])
+                edges = [tari, rtCal]+edges[1:] # first edge is the one ending rtCal
+                found = self.fromEdges(edges, types, edgeIndices)
+                if not found or len(found[0].edges) < len(edges) or iSync == len(valid):
+                    break
+                iSync += 1
+            
+            if found:
+                cmd = found[0]
+                tFirst = 1e6*(edgeIndices[0]-offset)/samplerate
+                cmd.start += tFirst
+                cmd.end += tFirst
+                cmds.append(cmd)
+                iCmdEnd = cmd.sampleEnd-offset
+        
+        return cmds
+    
+
+    def _lookupTypes(self, cmds):
+        '''
+        Looks up the command message types from the data bits
+
+        :param cmds: list of received commands
+        '''
         for cmd in cmds:
             if cmd.bits:
-                try:
-                    cmd.message = fromBits(cmd.bits)
-                except:
-                    print('Could not lookup command message from bits {} (edges: {})'.format(
-                        cmd.bits, ', '.join('{:.1f}'.format(e) for e in cmd.edges)))
-                
-                # calculate backscatter if message was Query
-                if isinstance(cmd.message, Query) and cmd.trCal:
-                    cmd.blf = cmd.message.dr.value/cmd.trCal
+                cmd.msgType = typeFromBits(cmd.bits)
+            if not cmd.msgType:
+                self._reportUnknown(cmd)
+    
+
+    @staticmethod
+    def _reportUnknown(cmd):
+        '''
+        Reports a command without message type
+
+        :param cmd: received command
+        '''
+        if cmd.bits:
+            print('Could not lookup command message from bits {} (edges: {})'.format(
+                cmd.bits, ', '.join('{:.1f}'.format(e) for e in cmd.edges)))
+        else:
+            print('Could not parse bits from edges: '+', '.join('{:.1f}'.format(e) for e in cmd.edges))
+
+
+class RealtimeTag(Tag):
+    '''
+    Parses reader commands from consecutive sample blocks and 
+    reports each command as soon as no raising edge followed for a timeout
+    '''
+    def __init__(self, callback, samplerate=1e6, timeout=None, mid=0.4, types=None, levelTau=1e-3, minDepth=0.2):
+        '''
+        :param callback: function called with each received command
+        :param samplerate: sample rate in Hz
+        :param timeout: time without raising edge in multiples of rtCal to finish a command, 
+            None for rtCal-tari/2 of the command. Data-1 lasts rtCal-tari (at most 2/3 rtCal), 
+            so the default is halfway between the longest data symbol and rtCal 
+            and reports before the earliest tag reply at T1 = max(rtCal, 10/blf).
+        :param mid: ratio (0=low...1=high) to define middle level
+        :param types: message classes to build messages for, None for all
+        :param levelTau: time constant in s with which the low and high level 
+            follow the sample blocks, e.g. to recover from outliers
+        :param minDepth: minimum difference of high and low level relative to the high level, 
+            blocks without modulation do not move the levels below it
+        '''
+        Tag.__init__(self)
+        self.callback = callback
+        self.samplerate = samplerate
+        self.timeout = timeout
+        self.mid = mid
+        self.types = types
+        self.levelTau = levelTau
+        self.minDepth = minDepth
+        self.sMin = None # low level, decaying towards the lowest sample magnitude of recent blocks
+        self.sMax = None # high level, decaying towards the highest sample magnitude of recent blocks
+        self.maxLatency = 0. # longest duration in s from receiving the deciding samples until callback
+        self.iSample = 0 # absolute index of the next sample
+        self._raised = False
+        self._iLast = 0 # absolute index of last raising edge
+        self._iPrev = 0 # absolute index of raising edge before last one
+        self._iPrev2 = 0 # absolute index of raising edge before that
+        self._dNew = 0. # duration of last edge in us
+        self._deadline = None # absolute index when the current command times out
+        self._cmd = ReceivedCommand(types)
+    
+
+    def process(self, samples):
+        '''
+        Parses a block of sample magnitudes, 
+        calls the callback for each finished command
+
+        :param samples: list of sample magnitudes following the last block
+        '''
+        tArrival = perf_counter()
+        if not len(samples):
+            return
+        
+        # prepare schmitt trigger with levels following the recent blocks
+        self._updateLevels(min(samples), max(samples), len(samples))
+        delta = self.sMax-self.sMin
+        hyst = 0.1
+        threshMid = self.sMin+self.mid*delta
+        threshHigh = threshMid+hyst*delta
+        threshLow = threshMid-hyst*delta
+
+        # get raising edges and time outs
+        iSample = self.iSample
+        for level in samples:
+            if level > threshHigh and not self._raised:
+                # raising edge occured
+                self._raised = True
+                self._edge(iSample, tArrival)
+            if level < threshLow and self._raised:
+                self._raised = False
+            if self._deadline is not None and iSample > self._deadline:
+                self._finish(tArrival)
+            iSample += 1
+        self.iSample = iSample
+    
+
+    def _updateLevels(self, sMin, sMax, nSamples):
+        '''
+        Moves the low and high level towards the extremes of a block. 
+        The levels follow wider extremes immediately and narrower ones with the time constant.
+
+        :param sMin: lowest sample magnitude of the block
+        :param sMax: highest sample magnitude of the block
+        :param nSamples: number of samples of the block
+        '''
+        if self.sMin is None:
+            self.sMin, self.sMax = sMin, sMax
+            return
+        
+        decay = exp(-nSamples/(self.levelTau*self.samplerate))
+        newMin = min(sMin, sMin+(self.sMin-sMin)*decay)
+        newMax = max(sMax, sMax+(self.sMax-sMax)*decay)
+        if newMax-newMin >= self.minDepth*newMax or newMin < self.sMin or newMax > self.sMax:
+            self.sMin, self.sMax = newMin, newMax
+    
+
+    def flush(self):
+        '''
+        Finishes a pending command, e.g. at the end of the stream
+        '''
+        if self._cmd.rtCal:
+            self._finish(perf_counter())
+    
+
+    def _edge(self, iRaising, tArrival):
+        '''
+        Parses the edge ending at a raising edge like fromEdges
+
+        :param iRaising: absolute index of the raising edge
+        :param tArrival: time the block arrived
+        '''
+        self._iPrev2, self._iPrev, self._iLast = self._iPrev, self._iLast, iRaising
+        dOld = self._dNew
+        dNew = self._dNew = 1e6*(self._iLast-self._iPrev)/self.samplerate
+        cmd = self._cmd
+        if not cmd.rtCal:
+            # wait for reader -> tag calibration symbol
+            if self.MIN_TARI <= dOld <= self.MAX_TARI and 2*dOld <= dNew <= 3.5*dOld:
+                cmd.tari = dOld # get tari
+                cmd.rtCal = dNew # valid rtCal duration
+                cmd.sampleStart = self._iPrev2
+                cmd.start = 1e6*cmd.sampleStart/self.samplerate # get command start
+                cmd.edges = [dOld, dNew]
+        else:
+            # wait either for tag -> reader calibration symbol OR data
+            if not cmd.trCal and cmd.rtCal <= dNew <= 3*cmd.rtCal:
+                cmd.trCal = dNew # full reader -> tag preamble (query command)
+            elif cmd.bits and dNew > cmd.rtCal:
+                # end of command, should have timed out before
+                self._finish(tArrival, self._iPrev)
+                return
             else:
-                print('Could not parse bits from edges: '+', '.join('{:.1f}'.format(e) for e in cmd.edges))
+                cmd.bits.append(1 if dNew > cmd.rtCal/2 else 0) # data
+            cmd.edges.append(dNew)
         
-        return cmds
+        if cmd.rtCal:
+            wait = cmd.rtCal-cmd.tari/2 if self.timeout is None else self.timeout*cmd.rtCal
+            if not cmd.bits and not cmd.trCal:
+                wait = max(wait, 3*cmd.rtCal) # tag -> reader calibration symbol can follow with up to 3 rtCal
+            self._deadline = iRaising+wait*1e-6*self.samplerate
+    
+
+    def _finish(self, tArrival, iEnd=None):
+        '''
+        Reports the current command and starts a new one
+
+        :param tArrival: time the block with the deciding samples arrived
+        :param iEnd: absolute index of the raising edge ending the command, defaults to the last one
+        '''
+        cmd = self._cmd
+        cmd.sampleEnd = self._iLast if iEnd is None else iEnd
+        cmd.end = 1e6*cmd.sampleEnd/self.samplerate
+        self._cmd = ReceivedCommand(self.types)
+        self._deadline = None
+
+        self._lookupTypes([cmd])
+        cmd.latency = perf_counter()-tArrival
+        self.maxLatency = max(self.maxLatency, cmd.latency)
+        self.callback(cmd)
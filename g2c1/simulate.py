@@ -0,0 +1,161 @@
+import os # to discard decoder reports of failed trials
+from contextlib import redirect_stdout # to discard decoder reports of failed trials
+from multiprocessing import Pool # to run trials in parallel
+from .base import LookUp, Value, EBV, Mask # to randomize message parts
+from .messages import Query, _messages # to generate messages of every type
+from .command import Reader # to render messages as pulses
+from .respond import Tag # to decode samples
+
+'''
+Monte Carlo link-level simulation: random messages are rendered as reader commands,
+passed through a noisy channel and decoded by a tag (requires numpy)
+'''
+
+
+class LinkSimulation:
+    '''
+    Measures the command error rate of the tag decoder over a channel
+    with noise, finite rise time, level drift and timing jitter
+    '''
+    def __init__(self, tariUs=12.5, blfMHz=0.25, samplerate=2e6, riseUs=1., drift=0.1, jitterUs=0.1, avg=1, types=_messages):
+        '''
+        :param tariUs: reader data-0 symbol length in us
+        :param blfMHz: tag backscatter frequency in MHz
+        :param samplerate: sample rate in Hz
+        :param riseUs: rise and fall time of the reader pulses in us
+        :param drift: maximum relative change of the carrier level over a command
+        :param jitterUs: standard deviation of the pulse durations in us
+        :param avg: length of the moving average filter of the tag in samples
+        :param types: message classes to generate randomly
+        '''
+        self.tari = tariUs
+        self.blf = blfMHz
+        self.samplerate = samplerate
+        self.rise = riseUs
+        self.drift = drift
+        self.jitter = jitterUs
+        self.avg = avg
+        self.types = types
+
+        # divide ratios resulting in a valid tag -> reader calibration symbol
+        rtCal = 3*tariUs
+        self.drs = [dr for dr in Query().dr.combos.values() if 1.1*rtCal <= dr/blfMHz <= 3*rtCal]
+        if Query in types and not self.drs:
+            raise ValueError('No divide ratio for backscatter frequency {} MHz with tari {} us'.format(blfMHz, tariUs))
+    
+
+    def randomMessage(self, rng):
+        '''
+        Generates a message with random parameters
+
+        :param rng: numpy random generator
+        :returns: message object
+        '''
+        msg = self.types[rng.integers(len(self.types))]()
+        for part in msg.parts:
+            if isinstance(part, LookUp):
+                values = list(part.combos.values())
+                part.value = values[rng.integers(len(values))]
+            elif isinstance(part, Value):
+                part.value = int(rng.integers(1 << part.nBits))
+            elif isinstance(part, EBV):
+                part.value = int(rng.integers(1 << 14))
+            elif isinstance(part, Mask):
+                part.value = rng.integers(2, size=rng.integers(97)).tolist()
+
+        if isinstance(msg, Query):
+            msg.dr.value = self.drs[rng.integers(len(self.drs))]
+        return msg
+    
+
+    def channel(self, pulses, snrDb, rng):
+        '''
+        Renders pulses as complex baseband samples with channel impairments
+
+        :param pulses: list of durations in us, toggling power level, first low
+        :param snrDb: carrier to noise power ratio in dB
+        :param rng: numpy random generator
+        :returns: numpy array of complex samples
+        '''
+        import numpy as np # for array math
+
+        # timing jitter and CW before and after the command
+        pulses = np.maximum(np.asarray(pulses)+self.jitter*rng.standard_normal(len(pulses)), 0.)
+        lead = 50.
+        bounds = lead+np.concatenate(([0.], np.cumsum(pulses)))
+        times = 1e6*np.arange(int((bounds[-1]+lead)*1e-6*self.samplerate))/self.samplerate
+
+        # levels are low inside even pulses and high otherwise
+        iPulse = np.searchsorted(bounds, times, 'right')
+        levels = ((iPulse == 0) | (iPulse == len(bounds)) | (iPulse % 2 == 0)).astype(float)
+
+        # finite rise time
+        nRise = int(round(self.rise*1e-6*self.samplerate))
+        if nRise > 1:
+            levels = np.convolve(levels, np.ones(nRise)/nRise, 'same')
+
+        # level drift, random carrier phase and noise
+        gain = 1.+self.drift*rng.uniform(-1., 1.)*times/times[-1]
+        phase = np.exp(2j*np.pi*rng.uniform())
+        sigma = 10**(-snrDb/20)/np.sqrt(2)
+        noise = sigma*(rng.standard_normal(len(levels))+1j*rng.standard_normal(len(levels)))
+        return (gain*levels*phase+noise).astype(np.complex64)
+    
+
+    def trial(self, snrDb, rng):
+        '''
+        Encodes a random message, passes it through the channel and decodes it
+
+        :param snrDb: carrier to noise power ratio in dB
+        :param rng: numpy random generator
+        :returns: True if exactly the sent command was decoded
+        '''
+        msg = self.randomMessage(rng)
+        reader = Reader(self.tari, self.blf)
+        iq = self.channel(reader.toPulses(msg), snrDb, rng)
+
+        tag = Tag()
+        cmds = tag.fromEdges(tag.iqToEdges(iq, self.samplerate, self.avg), ())
+        return len(cmds) == 1 and cmds[0].bits == msg.toBits()
+    
+
+    def countErrors(self, snrDb, nTrials, seed):
+        '''
+        Runs trials with deterministic random numbers
+
+        :param snrDb: carrier to noise power ratio in dB
+        :param nTrials: number of trials
+        :param seed: int or sequence of ints to seed the random generator
+        :returns: number of failed trials
+        '''
+        import numpy as np # for random numbers
+
+        rng = np.random.default_rng(seed)
+        with open(os.devnull, 'w') as devNull, redirect_stdout(devNull):
+            return sum(not self.trial(snrDb, rng) for _ in range(nTrials))
+    
+
+    def errorRates(self, snrsDb, nTrials, seed=0, processes=None, chunk=1000):
+        '''
+        Measures the command error rates with trials distributed over a process pool.
+        Trials are split into chunks with their own seeds,
+        so the results do not depend on the number of processes.
+
+        :param snrsDb: list of carrier to noise power ratios in dB
+        :param nTrials: number of trials per ratio
+        :param seed: int to seed the random generators
+        :param processes: number of processes, None for number of CPUs, 1 runs in this process
+        :param chunk: maximum number of trials per task
+        :returns: list of command error rates corresponding to snrsDb
+        '''
+        tasks = [(snrDb, min(chunk, nTrials-iTrial), (seed, iSnr, iTrial))
+            for iSnr, snrDb in enumerate(snrsDb) for iTrial in range(0, nTrials, chunk)]
+        if processes == 1:
+            nErrors = [self.countErrors(*task) for task in tasks]
+        else:
+            with Pool(processes) as pool:
+                nErrors = pool.starmap(self.countErrors, tasks)
+
+        # sum errors of chunks per ratio
+        nChunks = len(tasks)//len(snrsDb) if snrsDb else 0
+        return [sum(nErrors[iSnr*nChunks:(iSnr+1)*nChunks])/nTrials for iSnr in range(len(snrsDb))]
@@ -8,4 +8,5 @@ setup(name='g2c1',
     author_email='niklas.beuster@tu-ilmenau.de',
     license='MIT',
     packages=['g2c1'],
+    entry_points={'console_scripts': ['g2c1-decode=g2c1.cli:main']},
     zip_safe=False)
\ No newline at end of file
@@ -1,7 +1,7 @@
-from g2c1.base import crc5, pulsesToSamples # to test checksum and convert pulses to samples
-from g2c1.messages import Query, QueryRep, fromBits # to test commands
+from g2c1.base import crc5, crc16, pulsesToSamples, iqToSamples # to test checksums and convert samples
+from g2c1.messages import Query, QueryAdjust, QueryRep, ACK, NAK, Select, Read, fromBits # to test commands
 from g2c1.command import Reader # to test reader functionalities
-from g2c1.respond import Tag # to test tag functionalities
+from g2c1.respond import Tag, RealtimeTag # to test tag functionalities
 
 
 def visualizePulses(pulses, samplerate=1e6, reportLens=True):
@@ -33,6 +33,45 @@ def testCRC5():
         raise ValueError('Invalid checksum check {} for bits+crc {}'.format(check, dataBits+validCRC))
 
 
+def testCRC16():
+    '''
+    Tests the crc16 checksum function
+    '''
+    print('Testing CRC16 checksum')
+    dataBits = [int(b) for c in b'123456789' for b in format(c, '08b')]
+    validCRC = [int(b) for b in format(0xD64E, '016b')]
+
+    # check checksum generation
+    testCRC = crc16(dataBits)
+    if testCRC != validCRC:
+        raise ValueError('Invalid checksum {} for bits {}'.format(testCRC, dataBits))
+
+
+def testVariableLength():
+    '''
+    Tests messages with variable-length parts
+    '''
+    print('Testing variable-length messages')
+    mask = 48*[1, 0] # 96 bit EPC mask
+    msg = Select(target='s2', action=4, pointer=200, mask=mask, truncate=True)
+    
+    # test to bits: 4 cmd, 3 target, 3 action, 2 bank, 16 pointer, 8 length, 96 mask, 1 truncate, 16 crc
+    bits = msg.toBits()
+    if len(bits) != 149 or bits[12:28] != [1, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0]:
+        raise ValueError('Invalid bits {} for {}'.format(bits, msg))
+
+    # test lookup and mask as view on bits
+    msgLookup = fromBits(bits)
+    if msgLookup != msg or msgLookup.mask.value.bits is not bits:
+        raise ValueError('Invalid values in looked up message {} from bits {}'.format(msgLookup, bits))
+    
+    # test multi-block pointer of other command
+    msg = Read('user', 1000, 2, 0xBEEF)
+    msgLookup = fromBits(msg.toBits())
+    if msgLookup != msg:
+        raise ValueError('Invalid values in looked up message {} from bits {}'.format(msgLookup, msg.toBits()))
+
+
 def testMessage(Msg, validValues, validBits):
     '''
     Tests a message
@@ -57,6 +96,34 @@ def testMessage(Msg, validValues, validBits):
         raise ValueError('Invalid values in looked up message {} from bits {}'.format(msgLookup, validBits))
 
 
+def testBulkDecode():
+    '''
+    Tests decoding many messages of the same type into columns
+    '''
+    import numpy as np # for bit matrices
+
+    print('Testing bulk decoding')
+    msgs = [Query(dr, m, True, 'sl', session, 'b', q) 
+        for dr in (8, 64/3) for m in (1, 2, 4, 8) for session in range(4) for q in range(16)]
+    bits = np.array([msg.toBits() for msg in msgs])
+    bits[5, 10] ^= 1 # corrupt one message
+    
+    # check columns against single message values
+    cols = Query().fromBitMatrix(bits)
+    for iMsg, msg in enumerate(msgs):
+        if iMsg != 5 and not all(cols[name][iMsg] == getattr(msg, name).value 
+            for name in ('dr', 'm', 'trExt', 'sel', 'session', 'target', 'q')):
+            raise ValueError('Invalid columns in row {} for {}'.format(iMsg, msg))
+    if cols['crcValid'][5] or not np.all(np.delete(cols['crcValid'], 5)):
+        raise ValueError('Invalid checksum column {}'.format(cols['crcValid']))
+
+    # check packed ints
+    packed = [int(''.join(str(b) for b in ACK(rn).toBits()), 2) for rn in (0, 1, 0xFFFF)]
+    cols = ACK().fromBitMatrix(packed)
+    if list(cols['rn']) != [0, 1, 0xFFFF]:
+        raise ValueError('Invalid RN16 column {}'.format(cols['rn']))
+
+
 def testReader(Msg):
     '''
     Tests the generation of reader commands
@@ -99,6 +166,405 @@ def testTag(Msg):
         raise TypeError('Bits where not converted to correct message')
 
 
+def testReaderSamples():
+    '''
+    Tests decoding of shaped baseband samples from cached symbol templates
+    '''
+    import numpy as np # for sample arrays
+
+    print('Testing reader baseband samples')
+    reader = Reader(12.5, 0.25)
+    cw = np.ones(100, np.float32)
+    for msg in [Query(64/3, 4, True), QueryRep(), ACK(0x1234), Select()]:
+        for riseUs in (0., 1.5):
+            samples = reader.toSamples(msg, 2e6, 0.8, riseUs)
+            if abs(samples.min()-0.2) > 1e-6 or abs(samples.max()-1.) > 1e-6:
+                raise ValueError('Invalid levels {}...{} of {}'.format(samples.min(), samples.max(), msg))
+            tag = Tag()
+            cmds = tag.fromEdges(tag.samplesToEdges(np.concatenate((cw, samples, cw)), 2e6))
+            if len(cmds) != 1 or cmds[0].message != msg:
+                raise ValueError('Invalid decoded messages {} of {}'.format([cmd.message for cmd in cmds], msg))
+    
+    # templates are reused
+    if reader.symbolTemplates(2e6, 4, 0.8, 1.5) is not Reader(12.5, 0.25).symbolTemplates(2e6, 4, 0.8, 1.5):
+        raise ValueError('Symbol templates not cached')
+
+
+def testTypeFilter():
+    '''
+    Tests building messages only for selected command types
+    '''
+    print('Testing message type filter')
+    reader = Reader()
+    pulses = reader.toPulses(Query())+[100]+reader.toPulses(QueryRep())+[100] # commands separated by CW
+    tag = Tag()
+    cmds = tag.fromEdges(tag.samplesToEdges(pulsesToSamples(pulses)), (Query,))
+    
+    # check types known for all commands, but only Query built
+    if [cmd.msgType for cmd in cmds] != [Query, QueryRep]:
+        raise TypeError('Invalid message types {}'.format([cmd.msgType for cmd in cmds]))
+    if cmds[0].message != Query() or cmds[1].message is not None:
+        raise TypeError('Invalid messages {}'.format([cmd.message for cmd in cmds]))
+    if abs(cmds[0].blf-reader.blf) > 0.01:
+        raise ValueError('Invalid backscatter frequency {}'.format(cmds[0].blf))
+    
+    # timing without any message
+    cmd = tag.fromEdges(tag.samplesToEdges(pulsesToSamples(pulses)), ())[0]
+    if abs(cmd.blf-reader.blf) > 0.01 or cmd._message is not None:
+        raise ValueError('Invalid backscatter frequency {} without message'.format(cmd.blf))
+
+
+def testInventory():
+    '''
+    Tests following inventory rounds from received commands
+    '''
+    from g2c1.inventory import InventoryTracker
+
+    print('Testing inventory tracker')
+    reader = Reader()
+    msgs = [Query(session=2, q=2), ACK(0x1234), QueryRep(2), QueryAdjust(2, 1), ACK(0x5678), QueryRep(2), 
+        Query(session=2, q=4), QueryRep(2)]
+    pulses = []
+    for msg in msgs:
+        pulses += reader.toPulses(msg)+[300] # commands separated by CW
+    tag = Tag()
+    cmds = tag.fromEdges(tag.samplesToEdges(pulsesToSamples(pulses)))
+    
+    # feed commands one at a time
+    tracker = InventoryTracker()
+    rounds = [tracker.add(cmd) for cmd in cmds]
+    rounds = [rnd for rnd in rounds if rnd]+tracker.finish()
+    if len(rounds) != 2 or rounds[0].slots != 4 or rounds[0].rns != [0x1234, 0x5678] or rounds[0].qFinal != 3:
+        raise ValueError('Invalid inventory rounds {}'.format(rounds))
+    if not rounds[0].start < rounds[0].end < rounds[1].start or rounds[1].slots != 2 or rounds[1].acks:
+        raise ValueError('Invalid inventory rounds {}'.format(rounds))
+
+
+def testRealtime():
+    '''
+    Tests reporting commands right after their end in sample blocks
+    '''
+    print('Testing real-time tag')
+    reader = Reader()
+    msgs = [Query(), QueryRep(), ACK(0x1234)]
+    pulses = []
+    for msg in msgs:
+        pulses += reader.toPulses(msg)+[500] # commands separated by CW
+    samples = pulsesToSamples(pulses, 2e6)
+
+    # process blocks, remember the block of each report
+    nBlock = 64
+    reports = []
+    tag = RealtimeTag(lambda cmd: reports.append((iBlock, cmd)), 2e6)
+    for iBlock in range(0, len(samples), nBlock):
+        tag.process(samples[iBlock:iBlock+nBlock])
+    
+    # check messages and that each command was reported in the block after its timeout, before T1 >= rtCal
+    if [cmd.message for _, cmd in reports] != msgs:
+        raise ValueError('Invalid real-time messages {}'.format([cmd.message for _, cmd in reports]))
+    for iBlock, cmd in reports:
+        iTimeout = cmd.sampleEnd+int((cmd.rtCal-cmd.tari/2)*2)+1
+        if not iBlock <= iTimeout < iBlock+nBlock or iTimeout >= cmd.sampleEnd+cmd.rtCal*2 or cmd.latency > tag.maxLatency:
+            raise ValueError('Command {} reported late in block {}'.format(cmd.message, iBlock))
+    
+    # levels recover from an outlier before the commands
+    reports = []
+    tag = RealtimeTag(lambda cmd: reports.append((iBlock, cmd)), 2e6)
+    outlier = [3.]+2000*[1.]+samples
+    for iBlock in range(0, len(outlier), nBlock):
+        tag.process(outlier[iBlock:iBlock+nBlock])
+    if [cmd.message for _, cmd in reports] != msgs:
+        raise ValueError('Invalid real-time messages {} after outlier'.format([cmd.message for _, cmd in reports]))
+
+
+def testFrontEnd(Msg):
+    '''
+    Tests the parsing of reader commands from complex IQ samples
+    '''
+    import numpy as np # for IQ sample generation
+
+    # generate oversampled IQ samples from reader command
+    reader = Reader()
+    msg = Msg()
+    print('Testing IQ front end with {}'.format(msg))
+    pulses = reader.toPulses(msg)
+    samples = pulsesToSamples(pulses, 4e6)
+    samples += 4*[max(samples)] # artifical CW to trigger last raising edge
+    iq = (np.array(samples)*np.exp(0.7j)).astype(np.complex64)
+    iqInt16 = np.stack((1000*iq.real, 1000*iq.imag), axis=1).astype(np.int16).ravel()
+
+    # try to parse with tag from complex and interleaved int16 IQ
+    tag = Tag()
+    for samps in (iq, iqInt16):
+        edges = tag.iqToEdges(samps, 4e6, avg=2, decim=4)
+        cmd = tag.fromEdges(edges)[0]
+        if cmd.message != msg:
+            print('parsed edge durations: {}'.format(edges))
+            raise ValueError('Invalid message {} parsed from IQ samples'.format(cmd.message))
+    
+    # chunked moving average equals direct one, short inputs result in no samples
+    direct = np.convolve(np.abs(iq), np.ones(5)/5, 'valid')[::3]
+    if not np.allclose(iqToSamples(iq, 5, 3, nChunk=7), direct, atol=1e-5) or len(iqToSamples(iq[:3], 5)):
+        raise ValueError('Invalid filtered IQ sample magnitudes')
+
+
+def testSampleIndices():
+    '''
+    Tests linking parsed commands to the samples of a capture
+    '''
+    import numpy as np # for sample views
+
+    print('Testing sample indices of commands')
+    reader = Reader()
+    queryPulses = reader.toPulses(Query())+[100] # commands separated by CW
+    capture = np.array(pulsesToSamples(queryPulses+reader.toPulses(QueryRep())+[100]))
+    
+    # parse second block of capture only, starting within CW
+    tag = Tag()
+    iBlock = sum(int(p) for p in queryPulses)-50
+    edges = tag.samplesToEdges(capture[iBlock:], offset=iBlock)
+    cmd = tag.fromEdges(edges, edgeIndices=tag.edgeIndices)[0]
+    if cmd.msgType is not QueryRep:
+        raise TypeError('Invalid message type {} in block'.format(cmd.msgType))
+    
+    # command samples between raising edges, matching command duration, as view of capture
+    view = cmd.sampleView(capture)
+    if (view[0] < 0.5 or capture[cmd.sampleStart-1] > 0.5 or capture[cmd.sampleEnd-1] > 0.5 
+        or len(view) != round(cmd.end-cmd.start) or not np.shares_memory(view, capture)):
+        raise ValueError('Invalid command samples {}...{} (edge indices: {})'.format(
+            cmd.sampleStart, cmd.sampleEnd, list(tag.edgeIndices)))
+
+
+def testFrameSync():
+    '''
+    Tests finding commands by correlation with frame-sync templates
+    '''
+    import numpy as np # for sample arrays
+
+    print('Testing frame-sync correlation')
+    reader = Reader()
+    msgs = [Query(), QueryRep(), ACK(0x1234)]
+    pulses = [100]
+    for msg in msgs:
+        pulses += reader.toPulses(msg)+[100] # commands separated by CW
+    samples = np.array(pulsesToSamples([0]+pulses, 2e6)) # start with CW
+    iDelim = int(np.argmax(samples < 0.5))
+    samples[iDelim+int(2*(12.5+1.5*reader.pw))] = 1. # spurious edge in low pulse of data-0 of the query
+    
+    # heuristic misses the query
+    tag = Tag()
+    cmds = tag.fromEdges(tag.samplesToEdges(samples, 2e6))
+    if [cmd.message for cmd in cmds] == msgs:
+        raise ValueError('Spurious edge did not hide the query')
+    
+    # correlation finds all commands
+    syncs = tag.findFrameSyncs(samples, 2e6)
+    cmds = tag.fromFrameSyncs(samples, syncs, 2e6)
+    if [cmd.message for cmd in cmds] != msgs or abs(syncs[0][0]-iDelim) > 4 or abs(syncs[0][2]-3*reader.tari) > 4:
+        raise ValueError('Invalid commands {} from frame-syncs {}'.format([cmd.message for cmd in cmds], syncs))
+    
+    # outlier in the carrier after the query and a wrong frame-sync inside the data of the ACK
+    samples[syncs[1][0]-20] = 3.
+    iPhantom = syncs[2][0]+int(2*(12.5+syncs[2][1]+syncs[2][2]+3*reader.tari))
+    cmds = tag.fromFrameSyncs(samples, syncs+[(iPhantom,)+syncs[2][1:]], 2e6)
+    if [cmd.message for cmd in cmds] != msgs:
+        raise ValueError('Invalid commands {} from frame-syncs with outlier'.format([cmd.message for cmd in cmds]))
+    
+    # tari and rtCal measured instead of the template grid, no frame-syncs inside data of long taris
+    for tari in (15, 23):
+        longReader = Reader(tari, 0.16)
+        pulses = [100]
+        for msg in msgs:
+            pulses += longReader.toPulses(msg)+[300]
+        longSamples = np.array(pulsesToSamples([0]+pulses, 4e6))
+        cmds = tag.fromFrameSyncs(longSamples, tag.findFrameSyncs(longSamples, 4e6), 4e6)
+        if [cmd.message for cmd in cmds] != msgs or any(abs(cmd.rtCal-3*tari) > 0.5 or abs(cmd.tari-tari) > 0.5 for cmd in cmds):
+            raise ValueError('Invalid commands {} from frame-syncs with tari {}'.format([cmd.message for cmd in cmds], tari))
+    
+    # noisy commands without phantom commands from frame-syncs inside data
+    rng = np.random.default_rng(0)
+    pulses = [100]
+    for msg in 20*msgs:
+        pulses += reader.toPulses(msg)+[100]
+    noisy = np.array(pulsesToSamples([0]+pulses, 2e6))
+    noisy += 0.05*rng.standard_normal(len(noisy))
+    cmds = tag.fromFrameSyncs(noisy, tag.findFrameSyncs(noisy, 2e6), 2e6)
+    if [cmd.message for cmd in cmds] != 20*msgs:
+        raise ValueError('Invalid commands {} from noisy frame-syncs'.format([cmd.message for cmd in cmds]))
+
+
+def testLog():
+    '''
+    Tests writing and memory-mapped reading of command logs
+    '''
+    import os, tempfile # for temporary log files
+    from g2c1.log import LogWriter, LogReader, TYPES, CRC_NONE, CRC_VALID
+
+    print('Testing command log')
+    reader = Reader()
+    pulses = reader.toPulses(Query())+[100]+reader.toPulses(QueryRep())+[100] # commands separated by CW
+    edges = Tag().samplesToEdges(pulsesToSamples(pulses))
+    cmds = Tag().fromEdges(edges)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        path = os.path.join(tmpDir, 'cmds.log')
+        # write two captures, second one appended later
+        with LogWriter(path, edges=True) as writer:
+            writer.write(cmds)
+        with LogWriter(path, edges=True) as writer:
+            writer.write(cmds, 1e6)
+        
+        log = LogReader(path)
+        if len(log) != 4 or [TYPES[t] for t in log['type']] != 2*['Query', 'QueryRep']:
+            raise ValueError('Invalid command types {} in log'.format(log['type']))
+        if list(log['crc']) != 2*[CRC_VALID, CRC_NONE]:
+            raise ValueError('Invalid checksum status {} in log'.format(log['crc']))
+        
+        # time range query
+        records = log.between(1e6, 2e6)
+        if len(records) != 2 or log.bits(records[0]) != cmds[0].bits:
+            raise ValueError('Invalid commands {} in time range'.format(records))
+        if not all(abs(e1-e2) < 1e-3 for e1, e2 in zip(log.commandEdges(records[1]), cmds[1].edges)):
+            raise ValueError('Invalid edges {} in log'.format(log.commandEdges(records[1])))
+        del log, records # release memory map
+
+        # continue after a writer was interrupted within a record
+        with open(path+'.edges', 'ab') as f:
+            f.write(bytes(10))
+        with open(path, 'ab') as f:
+            f.write(bytes(20))
+        with LogWriter(path, edges=True) as writer:
+            writer.write(cmds[1:], 2e6)
+        log = LogReader(path)
+        if len(log) != 5 or TYPES[log['type'][4]] != 'QueryRep' or list(log.commandEdges(4)) != list(log.commandEdges(1)):
+            raise ValueError('Invalid commands {} appended after interrupted writer'.format(log['type']))
+        del log
+        
+        # drop records whose edges were not written before the interruption
+        os.truncate(path+'.edges', os.path.getsize(path+'.edges')-8)
+        with LogWriter(path, edges=True) as writer:
+            writer.write(cmds[1:], 3e6)
+        log = LogReader(path)
+        if len(log) != 5 or log['start'][4] < 3e6 or list(log.commandEdges(4)) != list(log.commandEdges(1)):
+            raise ValueError('Invalid commands {} appended after lost edges'.format(log['start']))
+        del log
+
+        # checksums without messages
+        path = os.path.join(tmpDir, 'filtered.log')
+        with LogWriter(path) as writer:
+            writer.write(Tag().fromEdges(edges, ()))
+        log = LogReader(path)
+        if list(log['crc']) != [CRC_VALID, CRC_NONE] or not log['blf'][0] > 0:
+            raise ValueError('Invalid checksum status {} without messages'.format(log['crc']))
+        del log
+
+
+def testDecoderCli():
+    '''
+    Tests the streaming command line decoder on an interleaved 8 bit I/Q file
+    '''
+    import io, json, os, tempfile # for temporary sample files and output
+    import numpy as np # to write I/Q samples
+    from contextlib import redirect_stdout # to capture JSON lines
+    from g2c1.cli import main
+
+    print('Testing command line decoder')
+    reader = Reader()
+    msgs = [Query(), QueryRep(), ACK(0x1234)]
+    pulses = [100]
+    for msg in msgs:
+        pulses += reader.toPulses(msg)+[500] # commands separated by CW
+    levels = np.array(pulsesToSamples(pulses, 2e6))
+    levels = 1.-levels # pulsesToSamples starts low, so the leading pulse becomes CW
+    iq = np.stack((127.5+100*levels, 127.5+20*levels), 1).round().astype(np.uint8)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        path = os.path.join(tmpDir, 'samples.u8')
+        iq.tofile(path)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main([path, '-r', '2e6', '-f', 'u8', '-d', '2', '-b', '1000', '-s', '0'])
+        
+        # filtering across small blocks equals filtering all samples at once
+        runs = []
+        for nBlock in ('256', str(len(iq))):
+            runOutput = io.StringIO()
+            with redirect_stdout(runOutput):
+                main([path, '-r', '2e6', '-f', 'u8', '-a', '8', '-d', '2', '-b', nBlock, '-s', '0'])
+            runs.append([json.loads(line) for line in runOutput.getvalue().splitlines()])
+            for r in runs[-1]:
+                del r['latency']
+    
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    if [r['type'] for r in records] != ['Query', 'QueryRep', 'ACK'] or records[2]['fields']['rn'] != 0x1234:
+        raise ValueError('Invalid decoded records {}'.format(records))
+    if len(runs[0]) != 3 or runs[0] != runs[1]:
+        raise ValueError('Decoded records {} depend on block size, expected {}'.format(runs[0], runs[1]))
+
+
+def testBackends():
+    '''
+    Tests that all compute backends produce identical outputs
+    '''
+    import os, random # for backend selection and random test data
+    from contextlib import redirect_stdout # to discard reports of invalid commands
+    from g2c1 import backend
+    
+    print('Testing compute backends')
+    msgs = [Query(q=3), Query(64/3, 4, True), QueryRep(2), ACK(0xBEEF), NAK(), Select(mask=[1, 0, 1])]
+    outputs = {}
+    for name in backend.BACKENDS:
+        backend.use(name)
+        rand = random.Random(0) # same random test data for all backends
+        reader = Reader(12.5, 0.25)
+        tag = Tag()
+        pulses = []
+        for msg in 3*msgs:
+            pulses += reader.toPulses(msg)+[rand.uniform(50, 300)] # commands separated by CW
+        pulses = [p+rand.uniform(-0.5, 0.5) for p in pulses] # timing jitter
+        samples = pulsesToSamples(pulses, 2e6)
+        edges = tag.samplesToEdges(samples, 2e6, offset=100)
+        cmds = [(cmd.start, cmd.end, cmd.tari, cmd.rtCal, cmd.trCal, cmd.bits, cmd.edges, cmd.msgType, 
+            cmd.sampleStart, cmd.sampleEnd) for cmd in tag.fromEdges(edges, edgeIndices=tag.edgeIndices)]
+        checks = [crc5(cmd[5]) for cmd in cmds]
+        ints = reader.toPulses(msgs[0], True)
+
+        # random edges on a coarse grid, so lengths equal to rtCal and its multiples occur
+        grid = [6., 12., 12.5, 18.5, 24., 25., 37.5, 75., 112.5, 120., 300.]
+        randEdges = [rand.choice(grid)+rand.choice((-0.5, 0., 0.5)) for _ in range(3000)]
+        with open(os.devnull, 'w') as devNull, redirect_stdout(devNull): # mostly invalid commands
+            randCmds = [(cmd.start, cmd.end, cmd.tari, cmd.rtCal, cmd.trCal, cmd.bits, cmd.edges)
+                for cmd in tag.fromEdges(randEdges, ())]
+        outputs[name] = (samples, edges, tag.edgeIndices, cmds, checks, ints, randCmds)
+    backend.use(os.environ.get('G2C1_BACKEND', 'auto'))
+    
+    # compare with baseline
+    for name, output in outputs.items():
+        for what, base, test in zip(('samples', 'edges', 'edge indices', 'commands', 'checksums', 'int pulses', 'random commands'),
+                outputs['python'], output):
+            if base != test:
+                raise ValueError('Backend {} differs from python baseline in {}'.format(name, what))
+
+
+def testSimulation():
+    '''
+    Tests the link-level simulation of random commands over a noisy channel
+    '''
+    from g2c1.simulate import LinkSimulation
+    
+    print('Testing link-level simulation')
+    sim = LinkSimulation(avg=2)
+    rates = sim.errorRates([-5, 30], 40, processes=1, chunk=20)
+    if rates != [1., 0.]:
+        raise ValueError('Invalid command error rates {}'.format(rates))
+    
+    # results must not depend on the number of processes
+    rates = sim.errorRates([10], 40, processes=1, chunk=20)
+    ratesPool = sim.errorRates([10], 40, processes=2, chunk=20)
+    if rates != ratesPool:
+        raise ValueError('Command error rates {} differ from {} with process pool'.format(ratesPool, rates))
+
+
 def testPhysical():
     '''
     Tests the physical execution of commands with 
@@ -246,14 +712,57 @@ def testPhysicalQueryCombos():
 
 if __name__ == '__main__':
     testCRC5()
+    testCRC16()
     testMessage(
         Query, 
         [64/3, 1, False, 'all1', 1, 'b', 1], 
         [1, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 0, 1, 1, 0, 0, 0, 1])
+    testVariableLength()
+    try:
+        testBulkDecode()
+    except ImportError:
+        print('Bulk decoding test requires numpy')
     testReader(Query)
     testReader(QueryRep)
     testTag(Query)
     testTag(QueryRep)
+    testTag(Select)
+    testTypeFilter()
+    testInventory()
+    testRealtime()
+    try:
+        testFrontEnd(Query)
+        testFrontEnd(QueryRep)
+    except ImportError:
+        print('IQ front end test requires numpy')
+    try:
+        testSampleIndices()
+    except ImportError:
+        print('Sample index test requires numpy')
+    try:
+        testFrameSync()
+    except ImportError:
+        print('Frame-sync test requires numpy')
+    try:
+        testLog()
+    except ImportError:
+        print('Command log test requires numpy')
+    try:
+        testReaderSamples()
+    except ImportError:
+        print('Reader samples test requires numpy')
+    try:
+        testDecoderCli()
+    except ImportError:
+        print('Command line decoder test requires numpy')
+    try:
+        testBackends()
+    except ImportError:
+        print('Backend conformance test requires numpy')
+    try:
+        testSimulation()
+    except ImportError:
+        print('Simulation test requires numpy')
     try:
         #testPhysicalQueryCombos()
         testPhysical()